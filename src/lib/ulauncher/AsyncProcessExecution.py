@@ -0,0 +1,385 @@
+import os
+import sys
+import codecs
+import signal
+import asyncio
+import subprocess
+from .Capture import Capture
+from .ProcessExecution import ProcessExecution
+from .ProcessTelemetry import ProcessTelemetry
+
+# compatibility with python < 3.7
+getRunningLoop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+class AsyncProcessExecution(object):
+    """
+    Executes a process from an asyncio event loop (python 3 only).
+
+    It mirrors {@link ProcessExecution}: the output is relayed to the system's
+    streams and captured the same way, so the same stdout, stderr and exit
+    status are available once {@link execute} is done. Callbacks can be used
+    to stream the output (chunks or lines) as it arrives.
+    """
+
+    # maximum number of bytes read from a stream at once
+    __chunkSize = 65536
+
+    # seconds the output is still relayed once the process is gone (the
+    # streams can be held open by processes spawned by it)
+    __drainTimeout = 0.1
+
+    # seconds between the checks for the exit of the process (asyncio only
+    # reports it once the streams are closed on some python versions)
+    __pollInterval = 0.1
+
+    def __init__(self, args, env={}, shell=True, cwd=None, redirectStderrToStdout=False, stdoutCapture=None, stderrCapture=None, passthrough=False, stdoutCallback=None, stderrCallback=None, lineCallbacks=False, relay=True, telemetry=None):
+        """
+        Create an AsyncProcessExecution object (the process is spawned by {@link execute}).
+
+        The callbacks receive the data (bytes) read from the streams, by
+        default in chunks. When line callbacks are enabled they receive one
+        line at the time (including the newline). The relay tells if the output
+        should be written to the system's streams. The telemetry
+        ({@link ProcessTelemetry}) collects the resource usage of the process,
+        by default it's created through {@link ProcessTelemetry.createDefault}.
+        """
+        if stdoutCapture is None:
+            stdoutCapture = Capture.createDefault()
+
+        if stderrCapture is None:
+            stderrCapture = Capture.createDefault()
+
+        assert isinstance(stdoutCapture, Capture) and isinstance(stderrCapture, Capture), \
+            "Invalid Capture type!"
+
+        assert isinstance(args, list), "Invalid args list!"
+
+        self.__args = list(args)
+        self.__env = dict(env)
+        self.__shell = shell
+        self.__cwd = cwd
+        self.__redirectStderrToStdout = redirectStderrToStdout
+        self.__stdout = stdoutCapture
+        self.__stderr = stderrCapture
+        self.__passthrough = passthrough
+        self.__stdoutCallback = stdoutCallback
+        self.__stderrCallback = stderrCallback
+        self.__lineCallbacks = lineCallbacks
+        self.__relay = relay
+        self.__telemetry = ProcessTelemetry.createDefault() if telemetry is None else telemetry
+        self.__timedOut = False
+        self.__process = None
+
+    def isShell(self):
+        """
+        Return the process should run through a shell session.
+        """
+        return self.__shell
+
+    def env(self):
+        """
+        Return the environment for the process.
+        """
+        return self.__env
+
+    def cwd(self):
+        """
+        Return the current working directory used to launch the process.
+        """
+        return self.__cwd
+
+    def args(self):
+        """
+        Return a list of arguments used by the process.
+        """
+        return self.__args
+
+    def stderr(self):
+        """
+        Return the stderr data (bytes) kept by the stderr capture.
+        """
+        return self.__stderr.data()
+
+    def stdout(self):
+        """
+        Return the stdout data (bytes) kept by the stdout capture.
+        """
+        return self.__stdout.data()
+
+    def stderrCapture(self):
+        """
+        Return the capture used by the stderr stream.
+        """
+        return self.__stderr
+
+    def stdoutCapture(self):
+        """
+        Return the capture used by the stdout stream.
+        """
+        return self.__stdout
+
+    def redirectStderrToStdout(self):
+        """
+        Return a boolean telling if the stderr stream should be redirected to stdout.
+        """
+        return self.__redirectStderrToStdout
+
+    def isPassthrough(self):
+        """
+        Return a boolean telling if the process inherits the output streams (nothing is captured).
+        """
+        return self.__passthrough
+
+    def telemetry(self):
+        """
+        Return the telemetry about the resource usage of the process (None when disabled).
+
+        The process is reaped by the event loop, so the cpu time and the
+        memory peak only come from the samples of the process tree.
+        """
+        return self.__telemetry
+
+    def timedOut(self):
+        """
+        Return a boolean telling if the process has been killed for exceeding the timeout.
+        """
+        return self.__timedOut
+
+    def executionSuccess(self):
+        """
+        Return a boolean if the execution has been sucessfull.
+        """
+        return self.exitStatus() == 0
+
+    def exitStatus(self):
+        """
+        Return the exist status about the process (None while running).
+        """
+        return None if self.__process is None else self.__process.returncode
+
+    def pid(self):
+        """
+        Return the process id (None when the process has not been spawned yet).
+        """
+        return None if self.__process is None else self.__process.pid
+
+    async def execute(self, timeout=None, finishedCallback=None):
+        """
+        Spawn the process and wait for it to finish, returns itself.
+
+        The process is killed when it runs for longer than the timeout (in
+        seconds), when the execution gets cancelled or when a callback raises
+        an error (along with the processes spawned by it, unless running in
+        passthrough mode). Once the process is gone the output still available
+        is relayed for a short time, so processes spawned by it holding the
+        streams don't keep the execution waiting. The finished callback is
+        called with the execution once the process is finished (it's not
+        called when the execution fails).
+        """
+        stdoutStream = None if self.isPassthrough() else subprocess.PIPE
+        stderrStream = subprocess.STDOUT if self.redirectStderrToStdout() else stdoutStream
+
+        if self.isShell():
+            args = ['/bin/sh', '-c', ProcessExecution.shellCommand(self.args())]
+        else:
+            args = list(map(str, self.args()))
+            args[0] = ProcessExecution.findExecutable(args[0], self.env()) or args[0]
+
+        # the process runs in a session of its own, so the processes
+        # spawned by it can be killed as well (in passthrough mode it
+        # should stay attached to the terminal)
+        self.__process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=stdoutStream,
+            stderr=stderrStream,
+            env=self.env(),
+            cwd=self.cwd(),
+            start_new_session=not self.isPassthrough()
+        )
+
+        if self.__telemetry is not None:
+            self.__telemetry.start(self.__process.pid)
+
+        timeoutHandle = None
+        if timeout is not None:
+            timeoutHandle = getRunningLoop().call_later(timeout, self.__killTimedOut)
+
+        relayTasks = []
+        if self.__process.stdout is not None:
+            relayTasks.append(
+                asyncio.ensure_future(
+                    self.__relayStream(self.__process.stdout, self.__stdout, sys.stdout, self.__stdoutCallback)
+                )
+            )
+
+        if self.__process.stderr is not None:
+            relayTasks.append(
+                asyncio.ensure_future(
+                    self.__relayStream(self.__process.stderr, self.__stderr, sys.stderr, self.__stderrCallback)
+                )
+            )
+
+        try:
+            await self.__waitProcess(relayTasks)
+
+        except (Exception, asyncio.CancelledError):
+            self.__kill()
+            await self.__stopRelays(relayTasks)
+            await self.__process.wait()
+            raise
+
+        finally:
+            if timeoutHandle is not None:
+                timeoutHandle.cancel()
+
+            if self.__telemetry is not None:
+                self.__telemetry.stop()
+
+            self.__stdout.close()
+            self.__stderr.close()
+
+        if finishedCallback is not None:
+            finishedCallback(self)
+
+        return self
+
+    async def __waitProcess(self, relayTasks):
+        """
+        Wait for the process to finish and drain the output still available.
+
+        The errors raised by the relays (callbacks) are raised as soon as
+        they happen.
+        """
+        waitTask = asyncio.ensure_future(self.__process.wait())
+        try:
+            while not waitTask.done() and self.__process.returncode is None:
+                await asyncio.wait(
+                    [waitTask] + relayTasks,
+                    timeout=self.__pollInterval,
+                    return_when=asyncio.FIRST_EXCEPTION
+                )
+                self.__raiseRelayError(relayTasks)
+
+            pendingTasks = [task for task in relayTasks if not task.done()]
+            if pendingTasks:
+                await asyncio.wait(pendingTasks, timeout=self.__drainTimeout)
+                await self.__stopRelays(pendingTasks)
+
+                # the streams are still held by processes spawned by the
+                # process, asyncio has no public way to stop reading them
+                self.__process._transport.close()
+
+            self.__raiseRelayError(relayTasks)
+
+        finally:
+            if not waitTask.done():
+                waitTask.cancel()
+
+    @staticmethod
+    async def __stopRelays(relayTasks):
+        """
+        Cancel the relays that are still running and wait for them.
+        """
+        pendingTasks = [task for task in relayTasks if not task.done()]
+        for task in pendingTasks:
+            task.cancel()
+
+        if pendingTasks:
+            await asyncio.wait(pendingTasks)
+
+    @staticmethod
+    def __raiseRelayError(relayTasks):
+        """
+        Raise the error of the first relay that has failed.
+        """
+        for task in relayTasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    def __killTimedOut(self):
+        """
+        Kill the process for exceeding the timeout.
+        """
+        if self.__process.returncode is None:
+            self.__timedOut = True
+            self.__kill()
+
+    def __kill(self):
+        """
+        Kill the process along with the processes spawned by it (unless running in passthrough mode).
+        """
+        try:
+            if self.isPassthrough():
+                if self.__process.returncode is None:
+                    self.__process.kill()
+            else:
+                os.killpg(self.__process.pid, signal.SIGKILL)
+
+        # the processes are already gone
+        except OSError:
+            pass
+
+    async def __relayStream(self, reader, capture, stream, callback):
+        """
+        Relay the stream until it gets closed.
+        """
+        decoder = codecs.getincrementaldecoder('utf_8')('replace')
+        pendingLine = bytearray()
+
+        try:
+            while True:
+                data = await reader.read(self.__chunkSize)
+                self.__relayData(data, capture, stream, callback, decoder, pendingLine)
+
+                if not data:
+                    break
+
+        # the relay has been stopped while the stream is still open, what
+        # has been read is handled as the end of the stream
+        except asyncio.CancelledError:
+            self.__relayData(b'', capture, stream, callback, decoder, pendingLine)
+            raise
+
+    def __relayData(self, data, capture, stream, callback, decoder, pendingLine):
+        """
+        Capture the data read from a stream, relay it and pass it to the callback (empty data means the end of the stream).
+        """
+        capture.write(data)
+
+        if self.__relay:
+            text = decoder.decode(data, final=not data)
+            if text:
+                stream.write(text)
+                stream.flush()
+
+        if callback is None:
+            return
+
+        if self.__lineCallbacks:
+            self.__relayLines(data, pendingLine, callback)
+        elif data:
+            callback(data)
+
+    @staticmethod
+    def __relayLines(data, pendingLine, callback):
+        """
+        Pass the complete lines to the callback.
+
+        The last line is kept in the pending line (bytearray) until its newline
+        shows up or the stream is closed. Only the data that has just been read
+        is searched for newlines, so long lines are not scanned over and over.
+        """
+        offset = len(pendingLine)
+        pendingLine += data
+
+        end = pendingLine.rfind(b'\n', offset)
+        if end != -1:
+            lines = bytes(pendingLine[:end + 1]).split(b'\n')
+            del pendingLine[:end + 1]
+
+            for line in lines[:-1]:
+                callback(line + b'\n')
+
+        if not data and pendingLine:
+            callback(bytes(pendingLine))
+            del pendingLine[:]
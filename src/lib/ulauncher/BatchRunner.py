@@ -0,0 +1,189 @@
+import time
+import uver
+import multiprocessing
+from .LauncherRunner import LauncherRunner
+from .Launcher import Launcher
+from .Capture import Capture
+
+# concurrent.futures is only available for python 2 through the "futures" backport
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+class BatchRunner(object):
+    """
+    Runs many launcher jobs through a bounded pool of workers.
+
+    A job is described by the software, the executable type, the args and the
+    env. Jobs sharing the same software object and env only load the launcher
+    configuration and generate the launcher environment once. The preparation
+    happens in the calling thread, the workers only run the processes.
+    """
+
+    def __init__(self, ulauncherConfigDir, maxWorkers=None, timeout=None, useEnvCache=True, relay=False, captureType='spill'):
+        """
+        Create a batch runner.
+
+        The max workers is the number of jobs running at the same time (by
+        default the number of cpus). The timeout (in seconds) is used by the
+        jobs that don't define their own. The relay tells if the output of the
+        jobs should be written to the system's streams (it's always captured).
+        The capture type ({@link Capture}) is used by the jobs whose launcher
+        configuration does not define the "capture", by default the output is
+        spilled to temporary files so the results of many jobs don't need to
+        be kept in memory.
+        """
+        self.__launcherConfigDir = ulauncherConfigDir
+        self.__maxWorkers = maxWorkers or multiprocessing.cpu_count()
+        self.__timeout = timeout
+        self.__useEnvCache = useEnvCache
+        self.__relay = relay
+        self.__captureType = captureType
+        self.__jobs = []
+
+    def launcherConfigDir(self):
+        """
+        Return a path about where the configuration for the launchers is localized.
+        """
+        return self.__launcherConfigDir
+
+    def maxWorkers(self):
+        """
+        Return the maximum number of jobs running at the same time.
+        """
+        return self.__maxWorkers
+
+    def timeout(self):
+        """
+        Return the default number of seconds a job can run for (None means no timeout).
+        """
+        return self.__timeout
+
+    def captureType(self):
+        """
+        Return the capture type used by the jobs that don't configure their own.
+        """
+        return self.__captureType
+
+    def addJob(self, software, executableType='default', args=[], env={}, timeout=None):
+        """
+        Add a job to the batch, returns the index of the job.
+        """
+        assert isinstance(software, uver.Versioned.Software), \
+            "Invalid Software Type!"
+
+        assert isinstance(args, list), \
+            "Invalid args type"
+
+        assert isinstance(env, dict), \
+            "Invalid dict type"
+
+        self.__jobs.append(
+            {
+                'software': software,
+                'executableType': executableType,
+                'args': list(args),
+                'env': dict(env),
+                'timeout': self.timeout() if timeout is None else timeout
+            }
+        )
+
+        return len(self.__jobs) - 1
+
+    def jobCount(self):
+        """
+        Return the number of jobs in the batch.
+        """
+        return len(self.__jobs)
+
+    def run(self):
+        """
+        Run all jobs and return a list with their results (in the order the jobs were added).
+
+        Each result is a dict containing: "exitStatus", "timedOut", "elapsed"
+        (seconds), "error" (None unless the job could not be launched) and
+        "processExecution" (None when the job could not be launched).
+        """
+        assert ThreadPoolExecutor is not None, \
+            'Batch runner requires concurrent.futures!'
+
+        results = [None] * len(self.__jobs)
+
+        # creating the launchers upfront, sharing the loader and
+        # the generated environment among similar jobs
+        launchers = []
+        prepared = {}
+        for index, job in enumerate(self.__jobs):
+            try:
+                key = (id(job['software']), tuple(sorted(job['env'].items())))
+                if key not in prepared:
+                    prepared[key] = self.__prepare(job)
+
+                loader, launcherEnv, hasConfigArgs = prepared[key]
+                if not hasConfigArgs:
+                    loader.setLauncherConfig('args', job['args'])
+
+                launchers.append((index, loader.createLauncher(launcherEnv)))
+
+            except Exception as err:
+                results[index] = self.__result(None, 0.0, err)
+
+        # creating the process wide history before the workers record to it
+        Launcher.history()
+
+        with ThreadPoolExecutor(max_workers=self.maxWorkers()) as executor:
+            futures = [
+                (index, executor.submit(self.__runJob, launcher, self.__jobs[index]))
+                for index, launcher in launchers
+            ]
+
+            for index, future in futures:
+                results[index] = future.result()
+
+        return results
+
+    def __prepare(self, job):
+        """
+        Return a tuple containing the loader, the launcher environment and if the configuration defines the args.
+        """
+        launcherRunner = LauncherRunner(job['software'], self.launcherConfigDir())
+        loader, launcherEnv = launcherRunner.prepare(job['env'], self.__useEnvCache)
+
+        return (loader, launcherEnv, 'args' in loader.launcherConfigNames())
+
+    def __runJob(self, launcher, job):
+        """
+        Run the launcher of a job, returns the result of the job.
+        """
+        kwargs = {}
+        if 'capture' not in launcher.configNames():
+            kwargs['stdoutCapture'] = Capture.create(self.captureType())
+            kwargs['stderrCapture'] = Capture.create(self.captureType())
+
+        startTime = time.time()
+        try:
+            processExecution = launcher.run(
+                job['executableType'],
+                timeout=job['timeout'],
+                relay=self.__relay,
+                **kwargs
+            )
+
+        except Exception as err:
+            return self.__result(None, time.time() - startTime, err)
+
+        return self.__result(processExecution, time.time() - startTime)
+
+    @staticmethod
+    def __result(processExecution, elapsed, error=None):
+        """
+        Return a dict describing the result of a job.
+        """
+        return {
+            'exitStatus': None if processExecution is None else processExecution.exitStatus(),
+            'timedOut': False if processExecution is None else processExecution.timedOut(),
+            'elapsed': elapsed,
+            'error': None if error is None else str(error),
+            'processExecution': processExecution
+        }
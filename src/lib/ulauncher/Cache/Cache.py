@@ -0,0 +1,194 @@
+import os
+import time
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+class Cache(object):
+    """
+    In-memory LRU cache with per-entry expiration and an optional persistent store.
+
+    The cache can be shared by many threads, the access to the entries is
+    serialized through a lock.
+    """
+
+    def __init__(self, maxSize=256, ttl=None, storePath=None):
+        """
+        Create a cache object.
+
+        The ttl is the default expiration time (in seconds) for the entries,
+        None means they never expire. When a store path is provided the
+        entries are loaded from it and can be written back through {@link save}.
+        """
+        self.__entries = OrderedDict()
+        self.__maxSize = maxSize
+        self.__ttl = ttl
+        self.__storePath = storePath
+        self.__loaded = False
+        self.__modified = False
+        self.__lock = threading.RLock()
+
+    def maxSize(self):
+        """
+        Return the maximum number of entries kept by the cache.
+        """
+        return self.__maxSize
+
+    def ttl(self):
+        """
+        Return the default expiration time (in seconds) for the entries.
+        """
+        return self.__ttl
+
+    def storePath(self):
+        """
+        Return the path for the persistent store (None when not used).
+        """
+        return self.__storePath
+
+    def get(self, key, default=None):
+        """
+        Return the value for the key or the default value when not cached.
+        """
+        with self.__lock:
+            self.__load()
+
+            if key not in self.__entries:
+                return default
+
+            expiration, value = self.__entries[key]
+            if expiration is not None and expiration < time.time():
+                del self.__entries[key]
+                self.__modified = True
+                return default
+
+            # moving the entry to the end (most recently used)
+            del self.__entries[key]
+            self.__entries[key] = (expiration, value)
+
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Set the value for the key.
+
+        The ttl overrides the default expiration time for this entry.
+        """
+        with self.__lock:
+            self.__load()
+
+            if ttl is None:
+                ttl = self.ttl()
+
+            if key in self.__entries:
+                del self.__entries[key]
+
+            self.__entries[key] = (
+                None if ttl is None else time.time() + ttl,
+                value
+            )
+            self.__modified = True
+
+            # evicting the least recently used entries
+            while len(self.__entries) > self.maxSize():
+                self.__entries.popitem(last=False)
+
+    def remove(self, key):
+        """
+        Remove the entry for the key.
+        """
+        with self.__lock:
+            self.__load()
+
+            if key in self.__entries:
+                del self.__entries[key]
+                self.__modified = True
+
+    def keys(self):
+        """
+        Return a list of the cached keys, from the least to the most recently used.
+        """
+        with self.__lock:
+            self.__load()
+
+            return list(self.__entries.keys())
+
+    def clear(self):
+        """
+        Remove all entries from the cache, including the ones from the persistent store.
+        """
+        with self.__lock:
+            self.__entries = OrderedDict()
+            self.__loaded = True
+            self.__modified = False
+
+            if self.storePath() and os.path.exists(self.storePath()):
+                os.remove(self.storePath())
+
+    def save(self):
+        """
+        Write the entries to the persistent store in case they have been modified.
+        """
+        with self.__lock:
+            if not (self.storePath() and self.__modified):
+                return
+
+            # dropping the expired entries
+            now = time.time()
+            for key, (expiration, value) in list(self.__entries.items()):
+                if expiration is not None and expiration < now:
+                    del self.__entries[key]
+
+            storeDir = os.path.dirname(self.storePath())
+            if not os.path.exists(storeDir):
+                os.makedirs(storeDir)
+
+            # writing to a temporary file first, so concurrent readers never
+            # see a partially written store
+            fd, tempPath = tempfile.mkstemp(dir=storeDir, prefix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(
+                        list(self.__entries.items()),
+                        f,
+                        pickle.HIGHEST_PROTOCOL
+                    )
+                os.rename(tempPath, self.storePath())
+            except (IOError, OSError):
+                if os.path.exists(tempPath):
+                    os.remove(tempPath)
+                raise
+
+            self.__modified = False
+
+    @staticmethod
+    def userCacheDir():
+        """
+        Return the directory used to store the ulauncher caches for the current user.
+        """
+        return os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+            'ulauncher'
+        )
+
+    def __load(self):
+        """
+        Load the entries from the persistent store (only once).
+        """
+        if self.__loaded:
+            return
+        self.__loaded = True
+
+        if not (self.storePath() and os.path.exists(self.storePath())):
+            return
+
+        # a corrupted or incompatible store is treated as an empty cache
+        try:
+            with open(self.storePath(), 'rb') as f:
+                entries = pickle.load(f)
+        except Exception:
+            return
+
+        for key, entry in entries[-self.maxSize():]:
+            self.__entries[key] = entry
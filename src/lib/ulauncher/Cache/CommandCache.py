@@ -0,0 +1,109 @@
+import os
+import re
+import json
+import hashlib
+from .Cache import Cache
+
+class CommandCache(Cache):
+    """
+    Memoizes the output of commands "$(command)" used by the resource resolver.
+
+    The entries are keyed by the command text and the values of the
+    environment variables referenced by it.
+    """
+
+    # regex: marker used by the configurations to tell a command should never
+    # be cached, it's a no-op for the shell: "$(: nocache; command)"
+    __nonCacheableMarkerRegex = re.compile(r'^\s*:\s+nocache\s*;')
+
+    # regex: environment variables referenced by a command "$VAR" and "${VAR...}"
+    __varReferenceRegex = re.compile(r'\$\{?([A-Za-z_][A-Za-z0-9_]*)')
+
+    # commands that depend on user interaction
+    __nonCacheableCommandNames = set([
+        'uchooser',
+        'udirchooser'
+    ])
+
+    # env vars that affect any command
+    __commonVarNames = [
+        'PATH'
+    ]
+
+    def __init__(self, maxSize=512, ttl=300, storePath=None):
+        """
+        Create a command cache object.
+        """
+        super(CommandCache, self).__init__(maxSize, ttl, storePath)
+
+    def commandKey(self, command, env):
+        """
+        Return the key used to cache the command running under the env.
+        """
+        varNames = set(self.__commonVarNames)
+        varNames.update(self.__varReferenceRegex.findall(command))
+
+        return hashlib.sha1(
+            json.dumps(
+                [
+                    command,
+                    os.getcwd(),
+                    [[varName, env.get(varName)] for varName in sorted(varNames)]
+                ]
+            ).encode('utf_8')
+        ).hexdigest()
+
+    @staticmethod
+    def isCacheable(command):
+        """
+        Return a boolean telling if the output of the command can be cached.
+        """
+        if CommandCache.__nonCacheableMarkerRegex.match(command):
+            return False
+
+        words = command.split()
+        if words and os.path.basename(words[0]) in CommandCache.__nonCacheableCommandNames:
+            return False
+
+        return True
+
+    @staticmethod
+    def registerNonCacheableCommand(name):
+        """
+        Register a command name that should never be cached.
+        """
+        CommandCache.__nonCacheableCommandNames.add(name)
+
+    @staticmethod
+    def nonCacheableCommandNames():
+        """
+        Return a list of command names that are never cached.
+        """
+        return list(CommandCache.__nonCacheableCommandNames)
+
+    @staticmethod
+    def createDefault():
+        """
+        Return a command cache configured through the process environment.
+
+        The cache is opt-in, commands can have side effects or depend on
+        things that are not part of the key (time, files, servers...).
+        ULAUNCHER_COMMAND_CACHE: when "1" the cache is enabled (otherwise
+        returns None).
+        ULAUNCHER_COMMAND_CACHE_TTL: expiration time in seconds (default 300),
+        0 disables the cache.
+        ULAUNCHER_COMMAND_CACHE_PERSISTENT: when "1" the cache is stored
+        under the user cache dir, so the outputs are shared across launches.
+        """
+        if os.environ.get('ULAUNCHER_COMMAND_CACHE') != '1':
+            return None
+
+        ttl = int(os.environ.get('ULAUNCHER_COMMAND_CACHE_TTL', 300))
+        if ttl <= 0:
+            return None
+
+        storePath = None
+        if os.environ.get('ULAUNCHER_COMMAND_CACHE_PERSISTENT') == '1':
+            storePath = os.path.join(Cache.userCacheDir(), 'commands.cache')
+
+        return CommandCache(ttl=ttl, storePath=storePath)
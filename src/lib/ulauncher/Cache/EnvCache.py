@@ -0,0 +1,108 @@
+import os
+import json
+import hashlib
+from .Cache import Cache
+
+class EnvCache(Cache):
+    """
+    Caches the environment modifications generated for the launchers.
+
+    Entries are addressed by the contents of the launcher configuration,
+    the software, the enabled addons and the slice of the base environment
+    read by the modifications. The slice is only known after the modifications
+    are compiled, so it's stored per configuration and used by the lookups.
+
+    Modifications running commands "$(command)" are never cached, the
+    variables read by a command (directly or by the programs it runs) can't
+    be known, so their result could come from a different environment.
+    """
+
+    def __init__(self, maxSize=64, ttl=3600, storePath=None):
+        """
+        Create an env cache object.
+        """
+        super(EnvCache, self).__init__(maxSize, ttl, storePath)
+
+    def configKey(self, configDigest, softwareName, softwareVersion, addonNames):
+        """
+        Return the key for a launcher configuration running the software with the addons.
+
+        The config digest identifies the contents of the configuration
+        ({@link JsonLoader.contentsDigest}).
+        """
+        return self.__hash(
+            [
+                configDigest,
+                softwareName,
+                softwareVersion,
+                sorted(addonNames)
+            ]
+        )
+
+    def delta(self, configKey, baseEnv):
+        """
+        Return the cached modifications for the base environment (None when not cached).
+
+        The result follows the convention used by {@link EnvModifierPlan.generateDelta}.
+        """
+        envSlice = self.get('slice:{0}'.format(configKey))
+        if envSlice is None:
+            return None
+
+        return self.get(self.__envKey(configKey, envSlice, baseEnv))
+
+    def setDelta(self, configKey, plan, baseEnv, delta):
+        """
+        Cache the modifications generated by the plan for the base environment.
+
+        Returns a boolean telling if the modifications have been cached, plans
+        running commands are ignored.
+        """
+        if plan.hasCommands():
+            return False
+
+        envSlice = {
+            'varNames': list(plan.readVarNames())
+        }
+
+        self.set('slice:{0}'.format(configKey), envSlice)
+        self.set(self.__envKey(configKey, envSlice, baseEnv), delta)
+
+        return True
+
+    @staticmethod
+    def createDefault():
+        """
+        Return an env cache configured through the process environment.
+
+        ULAUNCHER_ENV_CACHE: when "1" the cache is enabled (otherwise returns None).
+        ULAUNCHER_ENV_CACHE_TTL: expiration time in seconds (default 3600).
+        ULAUNCHER_ENV_CACHE_SIZE: maximum number of entries (default 64).
+        The cache is stored under the user cache dir.
+        """
+        if os.environ.get('ULAUNCHER_ENV_CACHE') != '1':
+            return None
+
+        return EnvCache(
+            int(os.environ.get('ULAUNCHER_ENV_CACHE_SIZE', 64)),
+            int(os.environ.get('ULAUNCHER_ENV_CACHE_TTL', 3600)),
+            os.path.join(Cache.userCacheDir(), 'envs.cache')
+        )
+
+    def __envKey(self, configKey, envSlice, baseEnv):
+        """
+        Return the key for the modifications under the base environment.
+        """
+        return self.__hash(
+            [
+                configKey,
+                [[varName, baseEnv.get(varName)] for varName in envSlice['varNames']]
+            ]
+        )
+
+    @staticmethod
+    def __hash(data):
+        """
+        Return a hash for the json serializable data.
+        """
+        return hashlib.sha1(json.dumps(data).encode('utf_8')).hexdigest()
@@ -0,0 +1,171 @@
+import os
+import pickle
+import hashlib
+import tempfile
+from .Cache import Cache
+
+class LoaderCache(Cache):
+    """
+    Caches the state parsed from launcher configuration files.
+
+    The entries are validated against the modification time, size and inode
+    of the configuration file. Besides the in-process LRU layer, each state
+    is stored as a pickle file under the store dir, named after the hash of
+    the configuration path (the store dir works as the index). Fragments
+    included by a configuration are cached as entries of their own, so a
+    state only depends on the file it comes from.
+    """
+
+    # bumped when the layout of the cached state changes
+    __formatVersion = 4
+
+    def __init__(self, maxSize=32, storeDir=None):
+        """
+        Create a loader cache object.
+        """
+        super(LoaderCache, self).__init__(maxSize)
+
+        self.__storeDir = storeDir
+
+    def storeDir(self):
+        """
+        Return the directory used to store the states (None when not used).
+        """
+        return self.__storeDir
+
+    def state(self, filePath, signature=None):
+        """
+        Return the cached state for the configuration file (None when not cached or outdated).
+
+        The entry is validated against the signature, by default it's queried
+        from the file ({@link fileSignature}).
+        """
+        if signature is None:
+            try:
+                signature = self.fileSignature(filePath)
+            except OSError:
+                return None
+
+        entry = self.get(filePath)
+        if entry is None and self.storeDir():
+            entry = self.__readEntry(filePath)
+            if entry is not None:
+                self.set(filePath, entry)
+
+        if entry is None or entry[0] != signature:
+            return None
+
+        return entry[1]
+
+    def setState(self, filePath, state, signature=None):
+        """
+        Cache the state parsed from the configuration file.
+
+        The signature should be the one from the file at the moment it has
+        been read ({@link fileSignature}), by default it's queried from the file.
+        """
+        if signature is None:
+            signature = self.fileSignature(filePath)
+
+        entry = (signature, state)
+        self.set(filePath, entry)
+
+        if self.storeDir():
+            self.__writeEntry(filePath, entry)
+
+    def clear(self):
+        """
+        Remove all states from the cache, including the stored ones.
+        """
+        super(LoaderCache, self).clear()
+
+        if self.storeDir() and os.path.isdir(self.storeDir()):
+            for fileName in os.listdir(self.storeDir()):
+                os.remove(os.path.join(self.storeDir(), fileName))
+
+    @staticmethod
+    def fileSignature(filePath):
+        """
+        Return a tuple used to detect modifications in the file (mtime, size, inode).
+        """
+        stat = os.stat(filePath)
+
+        return (
+            getattr(stat, 'st_mtime_ns', stat.st_mtime),
+            stat.st_size,
+            stat.st_ino,
+            stat.st_dev
+        )
+
+    @staticmethod
+    def createDefault():
+        """
+        Return a loader cache configured through the process environment.
+
+        ULAUNCHER_LOADER_CACHE: when "0" the cache is disabled (returns None),
+        when "memory" the states are only cached in-process. Otherwise, they
+        are also stored under the user cache dir.
+        """
+        mode = os.environ.get('ULAUNCHER_LOADER_CACHE')
+        if mode == '0':
+            return None
+
+        storeDir = None
+        if mode != 'memory':
+            storeDir = os.path.join(Cache.userCacheDir(), 'loaders')
+
+        return LoaderCache(storeDir=storeDir)
+
+    def __entryPath(self, filePath):
+        """
+        Return the path used to store the entry for the configuration file.
+        """
+        return os.path.join(
+            self.storeDir(),
+            '{0}.pickle'.format(
+                hashlib.sha1(os.path.abspath(filePath).encode('utf_8')).hexdigest()
+            )
+        )
+
+    def __readEntry(self, filePath):
+        """
+        Return the stored entry for the configuration file (None when not available).
+        """
+        entryPath = self.__entryPath(filePath)
+        if not os.path.exists(entryPath):
+            return None
+
+        # a corrupted or incompatible entry is treated as not cached
+        try:
+            with open(entryPath, 'rb') as f:
+                formatVersion, entry = pickle.load(f)
+        except Exception:
+            return None
+
+        if formatVersion != self.__formatVersion:
+            return None
+
+        return entry
+
+    def __writeEntry(self, filePath, entry):
+        """
+        Write the entry for the configuration file to the store dir.
+        """
+        if not os.path.exists(self.storeDir()):
+            os.makedirs(self.storeDir())
+
+        # writing to a temporary file first, so concurrent readers never
+        # see a partially written entry
+        fd, tempPath = tempfile.mkstemp(dir=self.storeDir(), prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(
+                    (self.__formatVersion, entry),
+                    f,
+                    pickle.HIGHEST_PROTOCOL
+                )
+            os.rename(tempPath, self.__entryPath(filePath))
+        except (IOError, OSError):
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
@@ -0,0 +1,4 @@
+from .Cache import Cache
+from .CommandCache import CommandCache
+from .EnvCache import EnvCache
+from .LoaderCache import LoaderCache
@@ -0,0 +1,143 @@
+import os
+
+class CaptureNotRegisteredError(Exception):
+    """Capture not registered error."""
+
+class Capture(object):
+    """
+    Captures the output (bytes) of a process stream.
+
+    The base implementation keeps everything written to it, derived classes
+    implement policies that bound how much is kept.
+    """
+
+    __registered = {}
+
+    def __init__(self):
+        """
+        Create a capture object.
+        """
+        self.__buffer = bytearray()
+        self.__size = 0
+
+    def write(self, data):
+        """
+        Capture the data (bytes).
+        """
+        self.__size += len(data)
+        self._keep(data)
+
+    def data(self):
+        """
+        Return the bytes that have been kept.
+        """
+        return bytes(self.__buffer)
+
+    def tail(self, size):
+        """
+        Return the last bytes (up to size) of the data that has been kept.
+        """
+        if size <= 0:
+            return b''
+
+        return self.data()[-size:]
+
+    def stream(self, chunkSize=64 * 1024):
+        """
+        Return an iterator over the data that has been kept (chunks of bytes).
+        """
+        data = self.data()
+        for offset in range(0, len(data), chunkSize):
+            yield data[offset:offset + chunkSize]
+
+    def text(self):
+        """
+        Return the data that has been kept decoded as utf-8.
+        """
+        return self.data().decode('utf_8', 'replace')
+
+    def size(self):
+        """
+        Return the number of bytes written to the capture.
+        """
+        return self.__size
+
+    def droppedSize(self):
+        """
+        Return the number of bytes written to the capture that have not been kept.
+        """
+        return self.size() - self.keptSize()
+
+    def keptSize(self):
+        """
+        Return the number of bytes kept by the capture.
+        """
+        return len(self.__buffer)
+
+    def close(self):
+        """
+        Release the resources used by the capture (the data kept is still available).
+        """
+        pass
+
+    def _keep(self, data):
+        """
+        Keep the data written to the capture.
+
+        Should be re-implemented by derived classes (along with {@link data}
+        and {@link keptSize}) to change what is kept.
+        """
+        self.__buffer += data
+
+    @staticmethod
+    def create(name, *args, **kwargs):
+        """
+        Capture factory.
+        """
+        if name not in Capture.__registered:
+            raise CaptureNotRegisteredError(
+                'Invalid capture type "{0}"'.format(name)
+            )
+
+        return Capture.__registered[name](*args, **kwargs)
+
+    @staticmethod
+    def createDefault():
+        """
+        Return a capture configured through the process environment.
+
+        ULAUNCHER_CAPTURE: type of capture (default "ring", keeping the last
+        bytes of the output).
+        ULAUNCHER_CAPTURE_MAX_BYTES: maximum number of bytes kept by the
+        bounded captures (default 1MB).
+        """
+        name = os.environ.get('ULAUNCHER_CAPTURE', 'ring')
+        if name in ('all', 'none'):
+            return Capture.create(name)
+
+        return Capture.create(
+            name,
+            maxBytes=int(os.environ.get('ULAUNCHER_CAPTURE_MAX_BYTES', 1024 * 1024))
+        )
+
+    @staticmethod
+    def register(captureClass, name):
+        """
+        Register a capture type.
+
+        It can be factored later via {@link create}
+        """
+        assert issubclass(captureClass, Capture), "Invalid Capture class!"
+
+        Capture.__registered[name] = captureClass
+
+    @staticmethod
+    def registeredNames():
+        """
+        Return a list of registered capture types.
+        """
+        return Capture.__registered.keys()
+
+
+# registering capture
+Capture.register(Capture, 'all')
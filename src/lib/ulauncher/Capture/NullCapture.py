@@ -0,0 +1,28 @@
+from .Capture import Capture
+
+class NullCapture(Capture):
+    """
+    Capture that does not keep any data (only the size is tracked).
+    """
+
+    def data(self):
+        """
+        Return the bytes that have been kept.
+        """
+        return b''
+
+    def keptSize(self):
+        """
+        Return the number of bytes kept by the capture.
+        """
+        return 0
+
+    def _keep(self, data):
+        """
+        Discard the data written to the capture.
+        """
+        pass
+
+
+# registering capture
+Capture.register(NullCapture, 'none')
@@ -0,0 +1,55 @@
+from .Capture import Capture
+
+class RingCapture(Capture):
+    """
+    Capture that keeps the last bytes written to it (ring buffer).
+    """
+
+    def __init__(self, maxBytes=1024 * 1024):
+        """
+        Create a ring capture object keeping up to max bytes.
+        """
+        super(RingCapture, self).__init__()
+
+        assert maxBytes > 0, "Invalid max bytes!"
+
+        self.__maxBytes = maxBytes
+        self.__buffer = bytearray()
+
+    def maxBytes(self):
+        """
+        Return the maximum number of bytes kept by the capture.
+        """
+        return self.__maxBytes
+
+    def data(self):
+        """
+        Return the bytes that have been kept.
+        """
+        return bytes(self.__buffer)
+
+    def keptSize(self):
+        """
+        Return the number of bytes kept by the capture.
+        """
+        return len(self.__buffer)
+
+    def _keep(self, data):
+        """
+        Keep the data, dropping the oldest bytes when the buffer is full.
+        """
+        if len(data) >= self.__maxBytes:
+            self.__buffer = bytearray(data[-self.__maxBytes:])
+            return
+
+        self.__buffer += data
+
+        # deleting from the front of a bytearray does not move
+        # the remaining bytes (amortized)
+        overflow = len(self.__buffer) - self.__maxBytes
+        if overflow > 0:
+            del self.__buffer[:overflow]
+
+
+# registering capture
+Capture.register(RingCapture, 'ring')
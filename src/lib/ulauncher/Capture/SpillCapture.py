@@ -0,0 +1,129 @@
+import os
+import tempfile
+from .Capture import Capture
+
+class SpillCapture(Capture):
+    """
+    Capture that writes the data to a file rather than keeping it in memory.
+
+    The file is capped to max bytes, anything written after that is dropped.
+    When no file path is provided a temporary file is used (it gets removed
+    once the capture is gone). The data is read back from the file on demand,
+    use {@link stream} or {@link tail} to avoid loading all of it to memory.
+    """
+
+    def __init__(self, maxBytes=64 * 1024 * 1024, filePath=None):
+        """
+        Create a spill capture object.
+        """
+        super(SpillCapture, self).__init__()
+
+        self.__file = None
+        self.__tempFilePath = None
+
+        assert maxBytes > 0, "Invalid max bytes!"
+
+        self.__maxBytes = maxBytes
+        self.__filePath = filePath
+        self.__keptSize = 0
+
+        if filePath is None:
+            fd, self.__tempFilePath = tempfile.mkstemp(prefix='ulauncher')
+            self.__file = os.fdopen(fd, 'wb')
+        else:
+            self.__file = open(filePath, 'wb')
+
+    def maxBytes(self):
+        """
+        Return the maximum number of bytes written to the file.
+        """
+        return self.__maxBytes
+
+    def filePath(self):
+        """
+        Return the path for the file used by the capture (None when using a temporary file).
+        """
+        return self.__filePath
+
+    def data(self):
+        """
+        Return the bytes that have been kept.
+
+        It reads the whole file, {@link stream} reads it in chunks instead.
+        """
+        return b''.join(self.stream())
+
+    def stream(self, chunkSize=64 * 1024):
+        """
+        Return an iterator over the data that has been kept (chunks of bytes read from the file).
+        """
+        with self.__openForReading() as f:
+            remaining = self.__keptSize
+            while remaining > 0:
+                chunk = f.read(min(chunkSize, remaining))
+                if not chunk:
+                    break
+
+                remaining -= len(chunk)
+                yield chunk
+
+    def tail(self, size):
+        """
+        Return the last bytes (up to size) of the data that has been kept.
+        """
+        if size <= 0:
+            return b''
+
+        with self.__openForReading() as f:
+            f.seek(max(0, self.__keptSize - size))
+            return f.read(min(size, self.__keptSize))
+
+    def keptSize(self):
+        """
+        Return the number of bytes kept by the capture.
+        """
+        return self.__keptSize
+
+    def close(self):
+        """
+        Close the file used by the capture (the data is still read from the file).
+        """
+        if self.__file is None:
+            return
+
+        self.__file.close()
+        self.__file = None
+
+    def __del__(self):
+        """
+        Remove the temporary file used by the capture.
+        """
+        self.close()
+
+        if self.__tempFilePath is not None and os.path.exists(self.__tempFilePath):
+            os.remove(self.__tempFilePath)
+
+    def _keep(self, data):
+        """
+        Write the data to the file, up to max bytes.
+        """
+        available = self.__maxBytes - self.__keptSize
+        if available <= 0 or self.__file is None:
+            return
+
+        data = data[:available]
+        self.__file.write(data)
+        self.__keptSize += len(data)
+
+    def __openForReading(self):
+        """
+        Return a new file object reading the data written by the capture.
+        """
+        if self.__file is not None:
+            self.__file.flush()
+
+        return open(self.__tempFilePath or self.__filePath, 'rb')
+
+
+# registering capture
+Capture.register(SpillCapture, 'spill')
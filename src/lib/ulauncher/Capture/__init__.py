@@ -0,0 +1,4 @@
+from .Capture import Capture, CaptureNotRegisteredError
+from .NullCapture import NullCapture
+from .RingCapture import RingCapture
+from .SpillCapture import SpillCapture
@@ -1,4 +1,5 @@
-from .ResourceResolver import ResourceResolver
+from .EnvModifierPlan import EnvModifierPlan
+from .Timings import Timings
 from collections import OrderedDict
 
 # compatibility with python 2/3
@@ -29,11 +30,11 @@ class EnvModifier(object):
             'prepend': OrderedDict(),
             'append': OrderedDict(),
             'override': OrderedDict(),
-            'unset': set()
+            'unset': set(),
+            'pathlist': OrderedDict()
         }
 
         self.__setBaseEnv(baseEnv)
-        self.__resourceResolver = ResourceResolver(self.baseEnv())
 
     def baseEnv(self):
         """
@@ -48,22 +49,28 @@ class EnvModifier(object):
         assert isinstance(envModifier, EnvModifier), \
             "Invalid EnvModifier type!"
 
+        contents = envModifier._contents()
+
         # prepend
-        for varName in envModifier.prependVarNames():
-            self.addPrependVar(varName, envModifier.prependVar(varName))
+        for varName, value in contents['prepend'].items():
+            self.addPrependVar(varName, value)
 
         # append
-        for varName in envModifier.appendVarNames():
-            self.addAppendVar(varName, envModifier.appendVar(varName))
+        for varName, value in contents['append'].items():
+            self.addAppendVar(varName, value)
 
         # override
-        for varName in envModifier.overrideVarNames():
-            self.setOverrideVar(varName, envModifier.overrideVar(varName))
+        for varName, value in contents['override'].items():
+            self.setOverrideVar(varName, value)
 
         # unset
-        for varName in envModifier.unsetVarNames():
+        for varName in contents['unset']:
             self.addUnsetVar(varName)
 
+        # path list
+        for varName, options in contents['pathlist'].items():
+            self.setPathListVar(varName, **options)
+
     def addFromDict(self, inputDict):
         """
         Add the contents from a dict containg the vars inside of the operation type.
@@ -71,7 +78,9 @@ class EnvModifier(object):
         The dictionary must follow the specification where the operation types
         should contain another dict with the environment variables, except from
         unset that expects a list of variable names. The operation types are
-        (append, prepend, override and unset) and they can be optional:
+        (append, prepend, override and unset) and they can be optional. Also,
+        variables can be marked as path lists (optional) where the value of
+        each variable is a dict of options for the path list {@link setPathListVar}:
         {
             "append": [
                 "VAR_NAME": [
@@ -90,7 +99,12 @@ class EnvModifier(object):
             ],
             "unset": [
                 "VAR_NAME"
-            ]
+            ],
+            "pathlist": {
+                "VAR_NAME": {
+                    "normalize": false
+                }
+            }
         }
         """
         assert isinstance(inputDict, dict), \
@@ -116,6 +130,10 @@ class EnvModifier(object):
             for envName in inputDict["unset"]:
                 self.addUnsetVar(envName)
 
+        # path list
+        if 'pathlist' in inputDict:
+            self.__addPathListVarsFromDict(inputDict['pathlist'])
+
     def addPrependVar(self, name, value):
         """
         Add a value that is going to be prepended to the env.
@@ -132,18 +150,18 @@ class EnvModifier(object):
         """
         Return a list of values used by the prepend var.
         """
-        if name not in self.__env['prepend']:
+        if name not in self._contents()['prepend']:
             raise InvalidVarError(
                 'Invalid Variable "{0}"'.format(name)
             )
 
-        return self.__env['prepend'][name]
+        return self._contents()['prepend'][name]
 
     def prependVarNames(self):
         """
         Return a list of prepend var names.
         """
-        return self.__env['prepend'].keys()
+        return self._contents()['prepend'].keys()
 
     def addAppendVar(self, name, value):
         """
@@ -161,18 +179,18 @@ class EnvModifier(object):
         """
         Return a list of values used by the append var.
         """
-        if name not in self.__env['append']:
+        if name not in self._contents()['append']:
             raise InvalidVarError(
                 'Invalid Variable "{0}"'.format(name)
             )
 
-        return self.__env['append'][name]
+        return self._contents()['append'][name]
 
     def appendVarNames(self):
         """
         Return a list of append var names.
         """
-        return self.__env['append'].keys()
+        return self._contents()['append'].keys()
 
     def setOverrideVar(self, name, value):
         """
@@ -184,18 +202,18 @@ class EnvModifier(object):
         """
         Return the value that is going to be used to override the original value.
         """
-        if name not in self.__env['override']:
+        if name not in self._contents()['override']:
             raise InvalidVarError(
                 'Invalid Variable "{0}"'.format(name)
             )
 
-        return self.__env['override'][name]
+        return self._contents()['override'][name]
 
     def overrideVarNames(self):
         """
         Return a list of override var names.
         """
-        return self.__env['override'].keys()
+        return self._contents()['override'].keys()
 
     def addUnsetVar(self, name):
         """
@@ -207,102 +225,119 @@ class EnvModifier(object):
         """
         Return a list of variables that are going to be unset.
         """
-        return list(self.__env['unset'])
+        return list(self._contents()['unset'])
 
-    def generate(self):
+    def setPathListVar(self, name, **options):
         """
-        Return brand new environment based on the current configuration.
+        Set a variable to be handled as a path list (PATH, PYTHONPATH, etc).
+
+        The paths of a path list variable keep the order of their first
+        occurrence, where duplicated and empty entries are dropped ({@link PathList}).
+        Options:
+            normalize: normalizes the paths (default False).
         """
-        result = dict(self.baseEnv())
+        pathListOptions = {
+            'normalize': False
+        }
 
-        self.__modifyPrependVars(result)
-        self.__modifyAppendVars(result)
-        self.__modifyOverrideVars(result)
-        self.__modifyUnsetVars(result)
+        for optionName, optionValue in options.items():
+            if optionName not in pathListOptions:
+                raise InvalidOptionError(
+                    'Invalid path list option "{0}"'.format(optionName)
+                )
+            pathListOptions[optionName] = optionValue
 
-        return result
+        self.__env['pathlist'][name] = pathListOptions
 
-    def __modifyUnsetVars(self, env):
+    def pathListVar(self, name):
         """
-        Modify in place the env by unsetting the variables.
+        Return a dict containing the options used by the path list var.
         """
-        for varName in self.unsetVarNames():
-            if varName in env:
-                del env[varName]
+        if name not in self._contents()['pathlist']:
+            raise InvalidVarError(
+                'Invalid Variable "{0}"'.format(name)
+            )
 
-    def __modifyOverrideVars(self, env):
+        return dict(self._contents()['pathlist'][name])
+
+    def pathListVarNames(self):
         """
-        Modify in place the env by overriding variables.
+        Return a list of path list var names.
         """
-        for varName in self.overrideVarNames():
-            env[varName] = self.__convertEnvValue(
-                self.overrideVar(varName)
-            )
+        return self._contents()['pathlist'].keys()
 
-    def __modifyPrependVars(self, env):
+    def generate(self):
         """
-        Modify in place the env by prepending variables.
+        Return brand new environment based on the current configuration.
         """
-        for varName in self.prependVarNames():
-            convertedValue = self.__convertEnvValue(self.prependVar(varName))
+        with Timings.phase('env.generate'):
+            return self.compile().generate(self.baseEnv())
 
-            if varName in env and len(env[varName]):
-                convertedValue = '{0}{1}{2}'.format(
-                    convertedValue,
-                    self.__envPathSep(),
-                    env[varName]
-                )
+    def generateDelta(self):
+        """
+        Return a tuple containing the modifications for the base environment.
 
-            env[varName] = convertedValue
+        Rather than a full environment, the result contains a dict with the
+        variables that have been changed or added and a list of variables that
+        should be unset.
+        """
+        return self.compile().generateDelta(self.baseEnv())
 
-    def __modifyAppendVars(self, env):
+    def generateMany(self, baseEnvs):
         """
-        Modify in place the env by appending variables.
+        Return a list of brand new environments, one for each base environment.
+
+        The configuration gets compiled once and shared by all base environments.
         """
-        for varName in self.appendVarNames():
-            convertedValue = self.__convertEnvValue(self.appendVar(varName))
+        return self.compile().generateMany(baseEnvs)
 
-            if varName in env and len(env[varName]):
-                convertedValue = '{2}{1}{0}'.format(
-                    convertedValue,
-                    self.__envPathSep(),
-                    env[varName]
-                )
+    def compile(self):
+        """
+        Return an immutable plan with the current configuration.
 
-            env[varName] = convertedValue
+        {@link EnvModifierPlan}
+        """
+        contents = self._contents()
 
-    def __convertEnvValue(self, value):
+        return EnvModifierPlan(
+            [(varName, self.__convertEnvValue(value)) for varName, value in contents['prepend'].items()],
+            [(varName, self.__convertEnvValue(value)) for varName, value in contents['append'].items()],
+            [(varName, self.__convertEnvValue(value)) for varName, value in contents['override'].items()],
+            contents['unset'],
+            dict((varName, options['normalize']) for varName, options in contents['pathlist'].items())
+        )
+
+    def _contents(self):
+        """
+        Return a dict containing the modifications for each operation type.
+
+        Should be re-implemented by derived classes that provide the
+        modifications from somewhere else.
+        """
+        return self.__env
+
+    def __addPathListVarsFromDict(self, pathListDict):
         """
-        Convert a value to an environment convention.
+        Mark the variables from the dict (var name mapped to the options) as path lists.
         """
-        result = []
+        for envName, options in pathListDict.items():
+            self.setPathListVar(envName, **options)
 
+    def __convertEnvValue(self, value):
+        """
+        Convert a value to a list of values that need to be resolved.
+        """
         if isinstance(value, basestring):
-            result.append(value)
+            return [value]
         elif isinstance(value, list):
-            result = value
-        else:
-            raise InvalidVarValueError(
-                'Could not convert value: "{0}"'.format(str(value))
-            )
+            return list(value)
 
-        # in case of performance deterioration, it may worth to
-        # process all values in one go.
-        for index, value in enumerate(result):
-            result[index] = self.__resourceResolver.resolve(value)
-
-        return self.__envPathSep().join(map(str, result))
+        raise InvalidVarValueError(
+            'Could not convert value: "{0}"'.format(str(value))
+        )
 
     def __setBaseEnv(self, env):
         """
         Set a dict with the base environment that should be used for modification.
         """
         self.__baseEnv = dict(env)
-
-    def __envPathSep(self):
-        """
-        Return the env path separator.
-
-        Just in case we want to support other platforms  in the future...
-        """
-        return ':'
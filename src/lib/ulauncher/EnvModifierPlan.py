@@ -0,0 +1,243 @@
+import re
+from collections import OrderedDict
+from .ResourceResolver import ResourceResolver
+from .PathList import PathList
+
+class EnvModifierPlan(object):
+    """
+    Immutable plan of the operations described by an env modifier.
+
+    The plan is not bound to any environment, so it can be used to generate
+    environments for many base environments. Values that don't need to be
+    resolved are joined once when the plan is created.
+    """
+
+    # regex: environment variables referenced by a value "$VAR" and "${VAR...}"
+    __varReferenceRegex = re.compile(r'\$\{?([A-Za-z_][A-Za-z0-9_]*)')
+
+    def __init__(self, prepend=(), append=(), override=(), unset=(), pathLists={}):
+        """
+        Create an env modifier plan.
+
+        The prepend, append and override operations are sequences of tuples
+        containing the var name and the list of values for the var. The path
+        lists is a dict mapping the var names that should be handled as path
+        lists to a boolean telling if their paths should be normalized.
+        """
+        operations = []
+        for operationType, vars in (('prepend', prepend), ('append', append), ('override', override)):
+            for varName, values in vars:
+                operations.append(
+                    (operationType, varName) + self.__compileValues(values)
+                )
+
+        self.__operations = tuple(operations)
+        self.__unsetVarNames = tuple(unset)
+        self.__pathLists = dict(pathLists)
+
+        # unique values that need to be resolved per base environment
+        # (keeping the order they are defined)
+        dynamicValues = OrderedDict()
+        for operation in self.__operations:
+            for value in operation[3] or ():
+                if '$' in value:
+                    dynamicValues[value] = None
+        self.__dynamicValues = tuple(dynamicValues.keys())
+
+        self.__hasCommands = any(
+            '$(' in value or '`' in value for value in self.__dynamicValues
+        )
+
+        # variables from the base environment that affect the result
+        readVarNames = set(operation[1] for operation in self.__operations)
+        readVarNames.update(self.__unsetVarNames)
+        for value in self.__dynamicValues:
+            readVarNames.update(self.__varReferenceRegex.findall(value))
+        if self.__hasCommands:
+            readVarNames.add('PATH')
+        self.__readVarNames = tuple(sorted(readVarNames))
+
+    def operations(self):
+        """
+        Return a tuple containing the compiled operations as (operation type, var name, joined value, values).
+
+        The joined value is None when the values need to be resolved,
+        otherwise the values are None.
+        """
+        return self.__operations
+
+    def unsetVarNames(self):
+        """
+        Return a tuple of variables that are going to be unset.
+        """
+        return self.__unsetVarNames
+
+    def pathListVarNames(self):
+        """
+        Return a list of variables that are handled as path lists.
+        """
+        return list(self.__pathLists.keys())
+
+    def dynamicValues(self):
+        """
+        Return a tuple containing the values that need to be resolved per base environment.
+        """
+        return self.__dynamicValues
+
+    def hasCommands(self):
+        """
+        Return a boolean telling if any value runs commands "$(command)".
+        """
+        return self.__hasCommands
+
+    def readVarNames(self):
+        """
+        Return a tuple of the variables from the base environment that affect the result of the plan.
+
+        They are the modified variables, the variables referenced by the values
+        and PATH when commands are involved. Variables read indirectly by the
+        commands can't be detected.
+        """
+        return self.__readVarNames
+
+    def generate(self, baseEnv):
+        """
+        Return brand new environment based on the base environment.
+        """
+        result = dict(baseEnv)
+        modifiedVars, unsetVarNames = self.generateDelta(baseEnv)
+
+        result.update(modifiedVars)
+        for varName in unsetVarNames:
+            del result[varName]
+
+        return result
+
+    def generateDelta(self, baseEnv):
+        """
+        Return a tuple containing the modifications for the base environment.
+
+        The first item is a dict with the variables that have been changed or
+        added, the second item is a list of variables that should be unset.
+        Variables not touched by the plan are not part of the result.
+        """
+        modifiedVars = {}
+        resolvedValues = self.__resolveValues(baseEnv)
+
+        for operationType, varName, joinedValue, values in self.__operations:
+            if joinedValue is None:
+                joinedValue = self.__envPathSep().join(
+                    map(str, (resolvedValues.get(value, value) for value in values))
+                )
+
+            modifiedVars[varName] = self.__applyOperation(
+                operationType,
+                varName,
+                joinedValue,
+                modifiedVars[varName] if varName in modifiedVars else baseEnv.get(varName)
+            )
+
+        unsetVarNames = []
+        for varName in self.__unsetVarNames:
+            if varName in modifiedVars:
+                del modifiedVars[varName]
+
+            if varName in baseEnv:
+                unsetVarNames.append(varName)
+
+        # dropping the variables that ended up with the same value
+        for varName in list(modifiedVars.keys()):
+            if baseEnv.get(varName) == modifiedVars[varName]:
+                del modifiedVars[varName]
+
+        return (modifiedVars, unsetVarNames)
+
+    def generateMany(self, baseEnvs):
+        """
+        Return a list of brand new environments, one for each base environment.
+        """
+        return [self.generate(baseEnv) for baseEnv in baseEnvs]
+
+    def __applyOperation(self, operationType, varName, value, currentValue):
+        """
+        Return the value of the var after applying the operation to its current value.
+        """
+        if varName in self.__pathLists:
+            return self.__mergePathList(
+                operationType,
+                value,
+                currentValue or '',
+                self.__pathLists[varName]
+            )
+
+        if not currentValue:
+            return value
+
+        if operationType == 'prepend':
+            return '{0}{1}{2}'.format(
+                value,
+                self.__envPathSep(),
+                currentValue
+            )
+
+        if operationType == 'append':
+            return '{2}{1}{0}'.format(
+                value,
+                self.__envPathSep(),
+                currentValue
+            )
+
+        return value
+
+    def __mergePathList(self, operationType, value, currentValue, normalize):
+        """
+        Return the value merged with the current value of a path list var.
+        """
+        pathList = PathList(normalize, self.__envPathSep())
+
+        if operationType == 'prepend':
+            pathList.extend(value)
+            pathList.extend(currentValue)
+
+        elif operationType == 'append':
+            pathList.extend(currentValue)
+            pathList.extend(value)
+
+        else:
+            pathList.extend(value)
+
+        return pathList.value()
+
+    def __resolveValues(self, baseEnv):
+        """
+        Return a dict mapping the dynamic values to their resolved values.
+
+        All values are resolved in one go, so at most a single shell gets spawned.
+        """
+        if not self.__dynamicValues:
+            return {}
+
+        resolvedValues = ResourceResolver(baseEnv).resolveMany(self.__dynamicValues)
+
+        return dict(zip(self.__dynamicValues, resolvedValues))
+
+    def __compileValues(self, values):
+        """
+        Return a tuple containing the joined value and the values.
+
+        The joined value is computed upfront when none of the values need
+        to be resolved.
+        """
+        if any('$' in value for value in values):
+            return (None, tuple(values))
+
+        return (self.__envPathSep().join(map(str, values)), None)
+
+    @staticmethod
+    def __envPathSep():
+        """
+        Return the env path separator.
+
+        Just in case we want to support other platforms  in the future...
+        """
+        return ':'
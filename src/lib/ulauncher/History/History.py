@@ -0,0 +1,282 @@
+import os
+import sys
+import time
+import json
+import atexit
+import socket
+import hashlib
+import threading
+
+# compatibility with python 2/3
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+class HistoryNotRegisteredError(Exception):
+    """History not registered error."""
+
+class History(object):
+    """
+    Abstract store for the history of the launches (one entry per launch).
+
+    Entries are recorded in memory and written in batches by a background
+    thread, so recording never waits for the storage. The entries are pruned
+    by age and count to keep the storage bounded.
+    """
+
+    __registered = {}
+
+    # columns available to sort the queries
+    orderByNames = ('startTime', 'wallTime', 'cpuTime', 'peakRss')
+
+    def __init__(self, batchSize=64, maxAge=90 * 24 * 3600, maxEntries=100000, tailBytes=4096):
+        """
+        Create a history object.
+
+        The max age (in seconds) and the max entries define what is kept by
+        the pruning. The tail bytes is the maximum size of the output stored
+        per stream.
+        """
+        self.__batchSize = batchSize
+        self.__maxAge = maxAge
+        self.__maxEntries = maxEntries
+        self.__tailBytes = tailBytes
+        self.__queue = queue.Queue()
+        self.__thread = None
+        self.__threadLock = threading.Lock()
+        self.__pruned = False
+
+    def maxAge(self):
+        """
+        Return the maximum age (in seconds) of the entries kept by the pruning.
+        """
+        return self.__maxAge
+
+    def maxEntries(self):
+        """
+        Return the maximum number of entries kept by the pruning.
+        """
+        return self.__maxEntries
+
+    def tailBytes(self):
+        """
+        Return the maximum size (in bytes) of the output stored per stream.
+        """
+        return self.__tailBytes
+
+    def record(self, entry):
+        """
+        Record an entry (see {@link executionEntry}), it gets written in background.
+        """
+        assert isinstance(entry, dict), "Invalid entry type!"
+
+        with self.__threadLock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__writeLoop)
+                self.__thread.daemon = True
+                self.__thread.start()
+
+        self.__queue.put(entry)
+
+    def flush(self):
+        """
+        Wait until all recorded entries have been written.
+        """
+        if self.__thread is not None:
+            self.__queue.join()
+
+    def close(self):
+        """
+        Write the pending entries and stop the background thread.
+        """
+        with self.__threadLock:
+            if self.__thread is None:
+                return
+
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__thread = None
+
+    def query(self, software=None, since=None, until=None, orderBy='startTime', limit=20):
+        """
+        Return a list of entries (dicts) in descending order of the order by column.
+
+        The since and until are timestamps used to filter the start time of
+        the launches.
+        """
+        assert orderBy in self.orderByNames, \
+            "Invalid order by {0}".format(orderBy)
+
+        return self._query(software, since, until, orderBy, limit)
+
+    def prune(self, maxAge=None, maxEntries=None):
+        """
+        Remove the entries older than the max age and the oldest entries beyond the max entries.
+
+        By default the values from the history are used, returns the number
+        of entries removed.
+        """
+        return self._prune(
+            time.time() - (self.maxAge() if maxAge is None else maxAge),
+            self.maxEntries() if maxEntries is None else maxEntries
+        )
+
+    def executionEntry(self, software, processExecution, startTime, endTime):
+        """
+        Return an entry describing the launch of the software.
+        """
+        addonNames = []
+        for addonName in software.addonNames():
+            addon = software.addon(addonName)
+            if 'enabled' in addon.optionNames() and addon.option('enabled'):
+                addonNames.append(addonName)
+
+        telemetry = processExecution.telemetry()
+
+        return {
+            'startTime': startTime,
+            'software': software.name(),
+            'version': str(software.version()),
+            'addons': sorted(addonNames),
+            'argv': list(map(str, processExecution.args())),
+            'envDigest': self.envDigest(processExecution.env()),
+            'host': socket.gethostname(),
+            'wallTime': endTime - startTime,
+            'cpuTime': None if telemetry is None else telemetry.cpuTime(),
+            'peakRss': None if telemetry is None else telemetry.peakRss(),
+            'exitStatus': processExecution.exitStatus(),
+            'timedOut': processExecution.timedOut(),
+            'stdoutTail': processExecution.stdoutCapture().tail(self.tailBytes()),
+            'stderrTail': processExecution.stderrCapture().tail(self.tailBytes())
+        }
+
+    @staticmethod
+    def envDigest(env):
+        """
+        Return a digest of the environment.
+        """
+        return hashlib.sha1(
+            json.dumps(sorted(env.items())).encode('utf_8')
+        ).hexdigest()
+
+    @staticmethod
+    def create(name, *args, **kwargs):
+        """
+        History factory.
+        """
+        if name not in History.__registered:
+            raise HistoryNotRegisteredError(
+                'Invalid history type "{0}"'.format(name)
+            )
+
+        return History.__registered[name](*args, **kwargs)
+
+    @staticmethod
+    def createDefault():
+        """
+        Return a history configured through the process environment.
+
+        ULAUNCHER_HISTORY: type of history (default "sqlite"), "0" disables it (returns None).
+        ULAUNCHER_HISTORY_MAX_AGE: days the entries are kept (default 90).
+        ULAUNCHER_HISTORY_MAX_ENTRIES: maximum number of entries (default 100000).
+        ULAUNCHER_HISTORY_TAIL_BYTES: output stored per stream (default 4096).
+        """
+        name = os.environ.get('ULAUNCHER_HISTORY', 'sqlite')
+        if name == '0':
+            return None
+
+        history = History.create(
+            name,
+            maxAge=float(os.environ.get('ULAUNCHER_HISTORY_MAX_AGE', 90)) * 24 * 3600,
+            maxEntries=int(os.environ.get('ULAUNCHER_HISTORY_MAX_ENTRIES', 100000)),
+            tailBytes=int(os.environ.get('ULAUNCHER_HISTORY_TAIL_BYTES', 4096))
+        )
+
+        # making sure the recorded entries are written
+        atexit.register(history.close)
+
+        return history
+
+    @staticmethod
+    def register(historyClass, name):
+        """
+        Register a history type.
+
+        It can be factored later via {@link create}
+        """
+        assert issubclass(historyClass, History), "Invalid History class!"
+
+        History.__registered[name] = historyClass
+
+    @staticmethod
+    def registeredNames():
+        """
+        Return a list of registered history types.
+        """
+        return History.__registered.keys()
+
+    def _writeEntries(self, entries):
+        """
+        Write a list of entries to the storage.
+
+        Should be re-implemented by derived classes.
+        """
+        raise NotImplementedError
+
+    def _query(self, software, since, until, orderBy, limit):
+        """
+        Return a list of entries from the storage.
+
+        Should be re-implemented by derived classes.
+        """
+        raise NotImplementedError
+
+    def _prune(self, minStartTime, maxEntries):
+        """
+        Remove the entries started before the min start time and the oldest beyond the max entries.
+
+        Should be re-implemented by derived classes.
+        """
+        raise NotImplementedError
+
+    def __writeLoop(self):
+        """
+        Write the recorded entries in batches until the history gets closed.
+        """
+        running = True
+        while running:
+            batch = [self.__queue.get()]
+
+            # collecting the entries already waiting
+            while len(batch) < self.__batchSize:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            entries = [entry for entry in batch if entry is not None]
+            running = len(entries) == len(batch)
+
+            if entries:
+                self.__runSafely('write the history entries', self._writeEntries, entries)
+
+            # the storage is pruned once per process
+            if not self.__pruned:
+                self.__pruned = True
+                self.__runSafely('prune the history', self.prune)
+
+            for item in batch:
+                self.__queue.task_done()
+
+    @staticmethod
+    def __runSafely(description, function, *args):
+        """
+        Run the function reporting any error to the stderr.
+
+        The history should never take down a launch, so the errors are not raised.
+        """
+        try:
+            function(*args)
+        except Exception as err:
+            sys.stderr.write('ulauncher: could not {0}: {1}\n'.format(description, err))
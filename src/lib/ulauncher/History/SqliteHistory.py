@@ -0,0 +1,202 @@
+import os
+import json
+import sqlite3
+from .History import History
+
+class SqliteHistory(History):
+    """
+    Stores the history of the launches in a sqlite database.
+
+    The database uses the default rollback journal rather than WAL, since
+    WAL relies on shared memory that is not available when the database lives
+    on a network file system (NFS). Launchers recording at the same time wait
+    for each other through the busy timeout. The writes happen from the
+    background thread of the history, each batch in a single transaction.
+    """
+
+    __schema = (
+        'CREATE TABLE IF NOT EXISTS launches ('
+        'id INTEGER PRIMARY KEY, '
+        'startTime REAL NOT NULL, '
+        'software TEXT NOT NULL, '
+        'version TEXT, '
+        'addons TEXT, '
+        'argv TEXT, '
+        'envDigest TEXT, '
+        'host TEXT, '
+        'wallTime REAL, '
+        'cpuTime REAL, '
+        'peakRss INTEGER, '
+        'exitStatus INTEGER, '
+        'timedOut INTEGER, '
+        'stdoutTail BLOB, '
+        'stderrTail BLOB)',
+        'CREATE INDEX IF NOT EXISTS launchesStartTime ON launches (startTime)',
+        'CREATE INDEX IF NOT EXISTS launchesSoftware ON launches (software, startTime)'
+    )
+
+    __columnNames = (
+        'startTime',
+        'software',
+        'version',
+        'addons',
+        'argv',
+        'envDigest',
+        'host',
+        'wallTime',
+        'cpuTime',
+        'peakRss',
+        'exitStatus',
+        'timedOut',
+        'stdoutTail',
+        'stderrTail'
+    )
+
+    # columns stored as json
+    __jsonColumnNames = ('addons', 'argv')
+
+    # seconds waiting for a database locked by another process
+    __busyTimeout = 10.0
+
+    def __init__(self, filePath=None, **kwargs):
+        """
+        Create a sqlite history object.
+
+        By default the database is stored under the user data dir (or the
+        path defined by ULAUNCHER_HISTORY_PATH).
+        """
+        super(SqliteHistory, self).__init__(**kwargs)
+
+        if filePath is None:
+            filePath = os.environ.get('ULAUNCHER_HISTORY_PATH') or os.path.join(
+                os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share'),
+                'ulauncher',
+                'history.sqlite'
+            )
+
+        self.__filePath = filePath
+
+    def filePath(self):
+        """
+        Return the path for the database file.
+        """
+        return self.__filePath
+
+    def _writeEntries(self, entries):
+        """
+        Write a list of entries to the database.
+        """
+        rows = []
+        for entry in entries:
+            row = []
+            for columnName in self.__columnNames:
+                value = entry.get(columnName)
+                if columnName in self.__jsonColumnNames:
+                    value = json.dumps(value)
+                elif isinstance(value, bytes):
+                    value = sqlite3.Binary(value)
+                row.append(value)
+            rows.append(row)
+
+        connection = self.__connect()
+        try:
+            with connection:
+                connection.executemany(
+                    'INSERT INTO launches ({0}) VALUES ({1})'.format(
+                        ', '.join(self.__columnNames),
+                        ', '.join(['?'] * len(self.__columnNames))
+                    ),
+                    rows
+                )
+        finally:
+            connection.close()
+
+    def _query(self, software, since, until, orderBy, limit):
+        """
+        Return a list of entries from the database.
+        """
+        conditions = []
+        values = []
+        if software is not None:
+            conditions.append('software = ?')
+            values.append(software)
+
+        if since is not None:
+            conditions.append('startTime >= ?')
+            values.append(since)
+
+        if until is not None:
+            conditions.append('startTime < ?')
+            values.append(until)
+
+        query = 'SELECT {0} FROM launches'.format(', '.join(self.__columnNames))
+        if conditions:
+            query += ' WHERE {0}'.format(' AND '.join(conditions))
+
+        # null values (not collected) go last
+        query += ' ORDER BY {0} IS NULL, {0} DESC'.format(orderBy)
+        if limit is not None:
+            query += ' LIMIT ?'
+            values.append(limit)
+
+        connection = self.__connect()
+        try:
+            rows = connection.execute(query, values).fetchall()
+        finally:
+            connection.close()
+
+        result = []
+        for row in rows:
+            entry = dict(zip(self.__columnNames, row))
+            for columnName in self.__jsonColumnNames:
+                entry[columnName] = json.loads(entry[columnName]) if entry[columnName] else []
+            entry['timedOut'] = bool(entry['timedOut'])
+            entry['stdoutTail'] = bytes(entry['stdoutTail'] or b'')
+            entry['stderrTail'] = bytes(entry['stderrTail'] or b'')
+            result.append(entry)
+
+        return result
+
+    def _prune(self, minStartTime, maxEntries):
+        """
+        Remove the old entries from the database.
+        """
+        connection = self.__connect()
+        try:
+            with connection:
+                removed = connection.execute(
+                    'DELETE FROM launches WHERE startTime < ?',
+                    (minStartTime,)
+                ).rowcount
+
+                removed += connection.execute(
+                    'DELETE FROM launches WHERE id <= ('
+                    'SELECT id FROM launches ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                    (maxEntries,)
+                ).rowcount
+        finally:
+            connection.close()
+
+        return removed
+
+    def __connect(self):
+        """
+        Return a new connection to the database (creating it when necessary).
+        """
+        fileDir = os.path.dirname(self.filePath())
+        if fileDir and not os.path.exists(fileDir):
+            try:
+                os.makedirs(fileDir)
+            except OSError:
+                # created by another process in the meantime
+                pass
+
+        connection = sqlite3.connect(self.filePath(), timeout=self.__busyTimeout)
+        for statement in self.__schema:
+            connection.execute(statement)
+
+        return connection
+
+
+# registering history
+History.register(SqliteHistory, 'sqlite')
@@ -0,0 +1,2 @@
+from .History import History, HistoryNotRegisteredError
+from .SqliteHistory import SqliteHistory
@@ -1,10 +1,16 @@
 from .Launcher import Launcher
 from ..ProcessExecution import ProcessExecution
 from ..ResourceResolver import ResourceResolver
+from ..Capture import Capture
+from ..ShellCoprocess import ShellCoprocess
 
 class Bin(Launcher):
     """
     Binary launcher implementation.
+
+    The executable is spawned directly with the args, unless the "shell"
+    config is enabled. In that case it runs through a shell session, where
+    the executable can use shell syntax (the args are always quoted).
     """
 
     def __init__(self, *args, **kwargs):
@@ -15,9 +21,64 @@ class Bin(Launcher):
 
         self.__resourceResolver = ResourceResolver(self.env())
 
-    def _perform(self, executableType):
+    def _perform(self, executableType, **kwargs):
         """
         Implement the execution of the binary launcher.
+
+        The additional arguments (passthrough, relay, captures) are passed to the ProcessExecution.
+        """
+        processArgs, cwd = self.__processArgs(executableType)
+
+        return ProcessExecution(
+            processArgs,
+            self.env(),
+            shell=self.__useShell(),
+            cwd=cwd,
+            **self.__captureKwargs(kwargs)
+        )
+
+    def _aperform(self, executableType, **kwargs):
+        """
+        Implement the asynchronous execution of the binary launcher.
+        """
+        from ..AsyncProcessExecution import AsyncProcessExecution
+
+        processArgs, cwd = self.__processArgs(executableType)
+
+        return AsyncProcessExecution(
+            processArgs,
+            self.env(),
+            shell=self.__useShell(),
+            cwd=cwd,
+            **self.__captureKwargs(kwargs)
+        )
+
+    def _handOff(self, executableType, **kwargs):
+        """
+        Implement the hand-off of the binary launcher.
+        """
+        processArgs, cwd = self.__processArgs(executableType)
+
+        # the shells used to resolve the resources would outlive
+        # the current process otherwise
+        ShellCoprocess.closeAll()
+
+        ProcessExecution.handOff(
+            processArgs,
+            self.env(),
+            shell=self.__useShell(),
+            cwd=cwd
+        )
+
+    def __useShell(self):
+        """
+        Return a boolean telling if the executable should run through a shell session.
+        """
+        return 'shell' in self.configNames() and bool(self.config('shell'))
+
+    def __processArgs(self, executableType):
+        """
+        Return a tuple containing the process args and the current working directory.
         """
         assert executableType in self.config('executable'),\
             "Invalid executable type {}".format(executableType)
@@ -35,12 +96,44 @@ class Bin(Launcher):
         ]
         processArgs += args
 
-        return ProcessExecution(
-            processArgs,
-            self.env(),
-            shell=True,
-            cwd=cwd
-        )
+        return (processArgs, cwd)
+
+    def __captureKwargs(self, kwargs):
+        """
+        Return the kwargs including the captures for the streams (the captures passed by the caller take precedence).
+        """
+        result = dict(kwargs)
+        for streamName in ('stdout', 'stderr'):
+            captureName = '{0}Capture'.format(streamName)
+            if result.get(captureName) is None:
+                result[captureName] = self.__createCapture(streamName)
+
+        return result
+
+    def __createCapture(self, streamName):
+        """
+        Return the capture for the stream based on the "capture" config (None means default).
+
+        The config can be the capture type or an object containing the "type"
+        and the options for the capture. The "filePath" option is suffixed by
+        the stream name, so each stream gets its own file.
+        """
+        if 'capture' not in self.configNames():
+            return None
+
+        options = self.config('capture')
+        if not isinstance(options, dict):
+            options = {'type': options}
+
+        options = dict(options)
+        captureType = options.pop('type', 'ring')
+        if options.get('filePath'):
+            options['filePath'] = '{0}.{1}'.format(
+                self.__resourceResolver.resolve(options['filePath']),
+                streamName
+            )
+
+        return Capture.create(captureType, **options)
 
     @classmethod
     def requiredOptionNames(cls):
@@ -1,4 +1,7 @@
+import time
 from ..ProcessExecution import ProcessExecution
+from ..History import History
+from ..Timings import Timings
 from uver.Versioned import Software
 
 class MissingRequiredConfigError(Exception):
@@ -17,6 +20,10 @@ class Launcher(object):
 
     __registered = {}
 
+    # process wide history used to record the launches
+    __history = None
+    __historyCreated = False
+
     def __init__(self, software, env={}, config={}):
         """
         Create a launcher.
@@ -42,7 +49,7 @@ class Launcher(object):
         """
         Return the software instance that should be used by the launcher.
         """
-        self.__software
+        return self.__software
 
     def config(self, name):
         """
@@ -76,14 +83,26 @@ class Launcher(object):
         """
         raise NotImplemented
 
-    def run(self, executableType="default", **kwargs):
+    def run(self, executableType="default", passthrough=None, timeout=None, **kwargs):
         """
         Perform launcher.
 
-        TODO: The idea is to collect as much information as possible about the
-        execution, such as stdout, stderr, session time, processing peak, memory
-        peak (etc) and store them in the database.
+        The process is killed when it runs for longer than the timeout (in
+        seconds). The additional arguments are passed to {@link _perform}.
+
+        In passthrough mode the process inherits the output streams of the
+        launcher rather than having them relayed (and captured). When not
+        specified it's driven by the "passthrough" config (disabled by default).
+
+        The session time, cpu time, memory peak and I/O of the process tree
+        are available through {@link ProcessExecution.telemetry}.
+
+        The execution is recorded by the history ({@link history}).
         """
+        if self.__isPassthrough(passthrough):
+            kwargs['passthrough'] = True
+
+        startTime = time.time()
         processExecution = self._perform(executableType, **kwargs)
 
         assert isinstance(processExecution, ProcessExecution), \
@@ -92,15 +111,83 @@ class Launcher(object):
         # \todo: tell umediadeamon about:
         # processExecution.pid()
 
-        processExecution.execute()
+        with Timings.phase('process.execute', pid=processExecution.pid()):
+            processExecution.execute(timeout)
 
-        # \todo: store in database:
-        # processExecution.exitStatus()
-        # processExecution.stdout()
-        # processExecution.stderr()
+        self.__recordHistory(processExecution, startTime)
 
         return processExecution
 
+    def _aperform(self, executableType, **kwargs):
+        """
+        Return an AsyncProcessExecution object for the launcher (not executed yet).
+
+        Should be re-implemented by derived classes that support {@link arun}.
+        """
+        raise NotImplementedError
+
+    def arun(self, executableType="default", passthrough=None, timeout=None, **kwargs):
+        """
+        Perform launcher from an asyncio event loop (python 3 only).
+
+        Returns an awaitable that resolves to the AsyncProcessExecution once
+        the process is finished. It supports the same modes, timeout and
+        telemetry as {@link run}, the additional arguments (for instance the
+        stream callbacks) are passed to the AsyncProcessExecution.
+
+        The execution is recorded by the history ({@link history}) once the
+        process is finished.
+        """
+        if self.__isPassthrough(passthrough):
+            kwargs['passthrough'] = True
+
+        startTime = time.time()
+
+        return self._aperform(executableType, **kwargs).execute(
+            timeout,
+            lambda processExecution: self.__recordHistory(processExecution, startTime)
+        )
+
+    def handOff(self, executableType="default", **kwargs):
+        """
+        Replace the current process by the launched application (it never returns).
+
+        Unlike {@link run} nothing is supervised: the output is not captured
+        and the exit status is reported directly to the parent process.
+        """
+        self._handOff(executableType, **kwargs)
+
+    def _handOff(self, executableType, **kwargs):
+        """
+        Replace the current process by the launched application.
+
+        Should be re-implemented by derived classes that support the hand-off.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def history():
+        """
+        Return the history used to record the launches (None when disabled).
+
+        By default it's created through {@link History.createDefault}.
+        """
+        if not Launcher.__historyCreated:
+            Launcher.setHistory(History.createDefault())
+
+        return Launcher.__history
+
+    @staticmethod
+    def setHistory(history):
+        """
+        Set the history used to record the launches (None disables it).
+        """
+        assert history is None or isinstance(history, History), \
+            "Invalid History type!"
+
+        Launcher.__history = history
+        Launcher.__historyCreated = True
+
     @staticmethod
     def create(name, *args, **kwargs):
         """
@@ -139,6 +226,32 @@ class Launcher(object):
         """
         return []
 
+    def __recordHistory(self, processExecution, startTime):
+        """
+        Record the finished execution in the history (when enabled).
+        """
+        history = self.history()
+        if history is None:
+            return
+
+        history.record(
+            history.executionEntry(
+                self.software(),
+                processExecution,
+                startTime,
+                time.time()
+            )
+        )
+
+    def __isPassthrough(self, passthrough):
+        """
+        Return a boolean telling if the passthrough mode should be used (None means the "passthrough" config).
+        """
+        if passthrough is None:
+            return 'passthrough' in self.configNames() and bool(self.config('passthrough'))
+
+        return passthrough
+
     def __setSoftware(self, software):
         """
         Set the software that should be launched.
@@ -1,6 +1,9 @@
 import os
 import ulauncher
 import uver
+from .Cache import EnvCache
+from .Loader import ConfigBundle, InvalidConfigBundleError
+from .Timings import Timings
 
 class InvalidConfigDirError(Exception):
     """Invalid config dir error."""
@@ -10,6 +13,10 @@ class LauncherRunner(object):
     High level launcher runner.
     """
 
+    # process wide cache used to store the generated environments
+    __envCache = None
+    __envCacheCreated = False
+
     def __init__(self, software, ulauncherConfigDir):
         """
         Create a launcher runner.
@@ -40,9 +47,18 @@ class LauncherRunner(object):
         """
         return self.__launcherConfigDir
 
-    def run(self, executableType, args=[], env={}):
+    def run(self, executableType, args=[], env={}, useEnvCache=True, passthrough=None, handOff=False):
         """
         Launch an application.
+
+        The environment generated for the launcher is cached ({@link envCache}),
+        use the useEnvCache to bypass the cache. When the config dir contains
+        a bundle ({@link ConfigBundle}) the configuration and its fragments
+        are read from it ({@link configBundle}).
+        The passthrough is forwarded to {@link Launcher.run}. When hand-off
+        is enabled the current process is replaced by the application once
+        the environment is generated ({@link Launcher.handOff}), therefore
+        it never returns.
         """
         assert isinstance(args, list), \
             "Invalid args type"
@@ -50,6 +66,35 @@ class LauncherRunner(object):
         assert isinstance(env, dict), \
             "Invalid dict type"
 
+        loader, launcherEnv = self.prepare(env, useEnvCache)
+
+        # passing adittional args to the process (the args defined
+        # by the configuration take precedence)
+        if 'args' not in loader.launcherConfigNames():
+            loader.setLauncherConfig(
+                'args',
+                args
+            )
+
+        launcher = loader.createLauncher(launcherEnv)
+
+        # replacing the current process
+        if handOff:
+            launcher.handOff(executableType)
+
+        # running launcher
+        return launcher.run(executableType, passthrough)
+
+    def prepare(self, env={}, useEnvCache=True):
+        """
+        Return a tuple containing the loader (with the configuration loaded) and the launcher environment.
+
+        The loader can be used to create many launchers running with the
+        same environment ({@link Loader.createLauncher}).
+        """
+        assert isinstance(env, dict), \
+            "Invalid dict type"
+
         # try to find the application name under the configuration
         applicationConfiguration = os.path.join(
             self.launcherConfigDir(),
@@ -58,17 +103,120 @@ class LauncherRunner(object):
 
         loader = ulauncher.Loader.JsonLoader(self.software())
 
-        # passing adittional args to the process
-        loader.setLauncherConfig(
-            'args',
-            args
+        bundle = self.configBundle()
+
+        # falling back to the json files when the bundle is out of date
+        configName = os.path.relpath(applicationConfiguration, self.launcherConfigDir()).replace(os.sep, '/')
+        if bundle is not None and not bundle.isFresh(self.launcherConfigDir(), [configName]):
+            bundle.close()
+            bundle = None
+
+        try:
+            with Timings.phase('config.load', filePath=applicationConfiguration, bundled=bundle is not None):
+                loader.setConfigBundle(bundle, self.launcherConfigDir())
+                loader.loadFromJsonFile(applicationConfiguration)
+
+        finally:
+            loader.setConfigBundle(None)
+            if bundle is not None:
+                bundle.close()
+
+        launcherEnv = self.__launcherEnv(
+            loader,
+            env,
+            self.envCache() if useEnvCache else None
         )
 
-        loader.loadFromJsonFile(applicationConfiguration)
-        launcher = loader.launcher(env)
+        return (loader, launcherEnv)
 
-        # running launcher
-        return launcher.run(executableType)
+    @staticmethod
+    def envCache():
+        """
+        Return the cache used to store the generated environments (None when disabled).
+
+        By default it's created through {@link EnvCache.createDefault}.
+        """
+        if not LauncherRunner.__envCacheCreated:
+            LauncherRunner.setEnvCache(EnvCache.createDefault())
+
+        return LauncherRunner.__envCache
+
+    @staticmethod
+    def setEnvCache(envCache):
+        """
+        Set the cache used to store the generated environments (None disables it).
+        """
+        assert envCache is None or isinstance(envCache, EnvCache), \
+            "Invalid EnvCache type!"
+
+        LauncherRunner.__envCache = envCache
+        LauncherRunner.__envCacheCreated = True
+
+    def configBundle(self):
+        """
+        Return the bundle found under the config dir (None when not available).
+
+        The bundle is only used by {@link prepare} when it's newer than the
+        config dir and the configuration being loaded ({@link ConfigBundle.isFresh}),
+        otherwise the json files are used. It can be disabled by setting
+        ULAUNCHER_CONFIG_BUNDLE to "0". The caller is responsible for closing
+        the bundle.
+        """
+        if os.environ.get('ULAUNCHER_CONFIG_BUNDLE') == '0':
+            return None
+
+        bundlePath = os.path.join(self.launcherConfigDir(), ConfigBundle.fileName)
+        if not os.path.exists(bundlePath):
+            return None
+
+        try:
+            return ConfigBundle(bundlePath)
+        except (InvalidConfigBundleError, IOError, OSError, ValueError):
+            return None
+
+    def __launcherEnv(self, loader, env, envCache):
+        """
+        Return the environment for the launcher.
+
+        The environment modifications are looked up from the env cache, in
+        case they are not cached they get generated (and cached). The entries
+        are addressed by the contents of the configuration and the fragments
+        included by it ({@link JsonLoader.contentsDigest}), so modifying any
+        of them invalidates the entry.
+        """
+        configKey = None
+        delta = None
+        if envCache is not None:
+            with Timings.phase('env.cache') as phase:
+                configKey = envCache.configKey(
+                    loader.contentsDigest(),
+                    self.software().name(),
+                    str(self.software().version()),
+                    loader.enabledAddonNames()
+                )
+
+                delta = envCache.delta(configKey, env)
+                phase.setArg('hit', delta is not None)
+
+        if delta is None:
+            with Timings.phase('addon.merge', addons=loader.enabledAddonNames()):
+                plan = loader.envModifier(env).compile()
+
+            with Timings.phase('env.generate'):
+                delta = plan.generateDelta(env)
+
+            if envCache is not None and envCache.setDelta(configKey, plan, env, delta):
+                envCache.save()
+
+        modifiedVars, unsetVarNames = delta
+
+        result = dict(env)
+        result.update(modifiedVars)
+        for varName in unsetVarNames:
+            if varName in result:
+                del result[varName]
+
+        return result
 
     def __setSoftware(self, software):
         """
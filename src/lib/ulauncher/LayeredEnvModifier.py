@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from .EnvModifier import EnvModifier
+
+class LayeredEnvModifier(EnvModifier):
+    """
+    Env modifier composed by a stack of env modifiers (layers).
+
+    The layers are referenced rather than copied and they only get merged
+    (in a single pass) when the modifications are needed, for instance by
+    {@link generate}. The result is the same as adding each layer through
+    {@link EnvModifier.addFromEnvModifier} in order, where the modifications
+    added directly to the layered env modifier act as the top most layer.
+
+    The merged modifications are computed once and reused by the accessors
+    until a layer or a modification is added, therefore the layers should
+    not be modified once they have been added.
+    """
+
+    def __init__(self, baseEnv={}):
+        """
+        Create a layered env modifier object.
+        """
+        super(LayeredEnvModifier, self).__init__(baseEnv)
+
+        self.__layers = []
+        self.__mergedContents = None
+
+    def addLayer(self, envModifier):
+        """
+        Add an env modifier to the top of the stack (it takes precedence over the previous layers).
+        """
+        assert isinstance(envModifier, EnvModifier), \
+            "Invalid EnvModifier type!"
+
+        self.__layers.append(envModifier)
+        self.__mergedContents = None
+
+    def layers(self):
+        """
+        Return a list of the env modifiers used as layers.
+        """
+        return list(self.__layers)
+
+    def addPrependVar(self, name, value):
+        """
+        Add a value that is going to be prepended to the env (top most layer).
+        """
+        super(LayeredEnvModifier, self).addPrependVar(name, value)
+        self.__mergedContents = None
+
+    def addAppendVar(self, name, value):
+        """
+        Add a value that is going to be appended to the env (top most layer).
+        """
+        super(LayeredEnvModifier, self).addAppendVar(name, value)
+        self.__mergedContents = None
+
+    def setOverrideVar(self, name, value):
+        """
+        Set a value that is going to override the env (top most layer).
+        """
+        super(LayeredEnvModifier, self).setOverrideVar(name, value)
+        self.__mergedContents = None
+
+    def addUnsetVar(self, name):
+        """
+        Add a var that is going to be unset from the env (top most layer).
+        """
+        super(LayeredEnvModifier, self).addUnsetVar(name)
+        self.__mergedContents = None
+
+    def setPathListVar(self, name, **options):
+        """
+        Mark a var as path list (top most layer).
+        """
+        super(LayeredEnvModifier, self).setPathListVar(name, **options)
+        self.__mergedContents = None
+
+    def _contents(self):
+        """
+        Return a dict containing the modifications merged from all layers.
+        """
+        if self.__mergedContents is None:
+            self.__mergedContents = self.__mergeLayers()
+
+        return self.__mergedContents
+
+    def __mergeLayers(self):
+        """
+        Return a dict containing the modifications merged from all layers (in a single pass).
+        """
+        prependChunks = OrderedDict()
+        appendChunks = OrderedDict()
+        result = {
+            'prepend': OrderedDict(),
+            'append': OrderedDict(),
+            'override': OrderedDict(),
+            'unset': set(),
+            'pathlist': OrderedDict()
+        }
+
+        layers = self.__layers + [super(LayeredEnvModifier, self)]
+        for layer in layers:
+            contents = layer._contents()
+
+            for varName, value in contents['prepend'].items():
+                prependChunks.setdefault(varName, []).append(value)
+
+            for varName, value in contents['append'].items():
+                appendChunks.setdefault(varName, []).append(value)
+
+            result['override'].update(contents['override'])
+            result['unset'].update(contents['unset'])
+            result['pathlist'].update(contents['pathlist'])
+
+        # the values from the top most layers are prepended
+        # in front of the ones from the bottom layers
+        for varName, chunks in prependChunks.items():
+            result['prepend'][varName] = [value for chunk in reversed(chunks) for value in chunk]
+
+        for varName, chunks in appendChunks.items():
+            result['append'][varName] = [value for chunk in chunks for value in chunk]
+
+        return result
@@ -0,0 +1,271 @@
+import os
+import json
+import mmap
+import struct
+import tempfile
+
+class InvalidConfigBundleError(Exception):
+    """Invalid config bundle error."""
+
+class ConfigBundle(object):
+    """
+    Indexed bundle containing the contents of the launcher configurations.
+
+    The bundle is a single file holding every json file found under a config
+    directory, so loading a configuration becomes one sequential read rather
+    than opening files scattered over the (network) file system. Layout:
+    header (magic, version, entry count), index (for each entry: name,
+    offset, length, source mtime and source size) followed by the contents.
+    The file is memory mapped, only the index is parsed upfront.
+
+    Checking every source file when the bundle is used would cost a stat
+    per file, {@link isFresh} only performs a cheap check instead while
+    {@link outdatedNames} validates all of them. The bundle should be built
+    again once the configurations are modified.
+    """
+
+    fileName = 'launchers.bundle'
+
+    __magic = b'ULBUNDLE'
+    __version = 1
+    __headerStruct = struct.Struct('<8sII')
+    __nameStruct = struct.Struct('<H')
+    __entryStruct = struct.Struct('<QQdQ')
+
+    def __init__(self, bundlePath):
+        """
+        Create a config bundle object (reading the index from the bundle file).
+        """
+        self.__path = bundlePath
+        self.__index = {}
+
+        with open(bundlePath, 'rb') as f:
+            self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.__readIndex()
+
+    def path(self):
+        """
+        Return the path for the bundle file.
+        """
+        return self.__path
+
+    def names(self):
+        """
+        Return a list with the name of each entry, as paths relative to the config directory.
+        """
+        return self.__index.keys()
+
+    def hasName(self, name):
+        """
+        Return a boolean telling if the bundle contains an entry for the name.
+        """
+        return name in self.__index
+
+    def contents(self, name):
+        """
+        Return the bytes stored for the entry name.
+        """
+        offset, length = self.__entry(name)[:2]
+
+        return self.__data[offset:offset + length]
+
+    def signature(self, name):
+        """
+        Return a tuple identifying the version of the source file stored by the entry (mtime, size).
+        """
+        return tuple(self.__entry(name)[2:])
+
+    def isUpToDate(self, name, sourcePath):
+        """
+        Return a boolean telling if the entry matches the current state of its source file.
+        """
+        if not self.hasName(name):
+            return False
+
+        try:
+            stat = os.stat(sourcePath)
+        except OSError:
+            return False
+
+        mtime, size = self.__entry(name)[2:]
+
+        return stat.st_mtime == mtime and stat.st_size == size
+
+    def isFresh(self, configDir, names=[]):
+        """
+        Return a boolean telling if the bundle is newer than the config dir and the entries for the names are up to date.
+
+        The config dir is modified when files are added, removed or replaced
+        (editors usually save files that way), the names should be the
+        entries about to be used. Files modified in place under other
+        directories are not detected ({@link outdatedNames}).
+        """
+        try:
+            if os.stat(configDir).st_mtime > os.stat(self.path()).st_mtime:
+                return False
+        except OSError:
+            return False
+
+        for name in names:
+            if not self.isUpToDate(name, os.path.join(configDir, name)):
+                return False
+
+        return True
+
+    def outdatedNames(self, configDir):
+        """
+        Return a list of names that don't match the json files found under the config directory.
+
+        It contains the entries that are out of date, the entries whose
+        file is gone and the json files that are not part of the bundle.
+        """
+        result = []
+        sourceNames = set()
+        for name, filePath in ConfigBundle.__sourceFiles(configDir):
+            sourceNames.add(name)
+            if not self.isUpToDate(name, filePath):
+                result.append(name)
+
+        for name in self.names():
+            if name not in sourceNames:
+                result.append(name)
+
+        return sorted(result)
+
+    def close(self):
+        """
+        Release the memory mapped bundle.
+        """
+        self.__data.close()
+
+    @staticmethod
+    def build(configDir, bundlePath=None):
+        """
+        Build a bundle containing all json files found under the config directory.
+
+        By default the bundle is written to the config directory. Returns the
+        path for the bundle file.
+        """
+        if bundlePath is None:
+            bundlePath = os.path.join(configDir, ConfigBundle.fileName)
+
+        entries = [
+            ConfigBundle.__readSourceFile(name, filePath)
+            for name, filePath in ConfigBundle.__sourceFiles(configDir)
+        ]
+
+        ConfigBundle.__write(bundlePath, entries)
+
+        return bundlePath
+
+    @staticmethod
+    def __sourceFiles(configDir):
+        """
+        Return a list of tuples (name, file path) for the json files found under the config directory.
+        """
+        result = []
+        for root, dirNames, fileNames in os.walk(configDir):
+            dirNames.sort()
+            for fileName in sorted(fileNames):
+                if fileName.endswith('.json'):
+                    filePath = os.path.join(root, fileName)
+                    result.append(
+                        (os.path.relpath(filePath, configDir).replace(os.sep, '/'), filePath)
+                    )
+
+        return result
+
+    @staticmethod
+    def __readSourceFile(name, filePath):
+        """
+        Return a tuple (name, contents, mtime, size) for the json file.
+        """
+        stat = os.stat(filePath)
+        with open(filePath, 'rb') as f:
+            contents = f.read()
+
+        # making sure only valid configurations end up in the bundle
+        try:
+            json.loads(contents.decode('utf_8'))
+        except ValueError as err:
+            raise InvalidConfigBundleError(
+                'Invalid json "{0}": {1}'.format(filePath, err)
+            )
+
+        return (name.encode('utf_8'), contents, stat.st_mtime, stat.st_size)
+
+    @staticmethod
+    def __write(bundlePath, entries):
+        """
+        Write the entries to the bundle file.
+        """
+        # computing where the contents start
+        offset = ConfigBundle.__headerStruct.size
+        for name, contents, mtime, size in entries:
+            offset += ConfigBundle.__nameStruct.size + len(name) + ConfigBundle.__entryStruct.size
+
+        index = []
+        for name, contents, mtime, size in entries:
+            index.append(ConfigBundle.__nameStruct.pack(len(name)))
+            index.append(name)
+            index.append(ConfigBundle.__entryStruct.pack(offset, len(contents), mtime, size))
+            offset += len(contents)
+
+        # writing to a temporary file first, so launches running at the
+        # same time never see a partially written bundle
+        bundleDir = os.path.dirname(os.path.abspath(bundlePath))
+        fd, tempPath = tempfile.mkstemp(dir=bundleDir, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(ConfigBundle.__headerStruct.pack(ConfigBundle.__magic, ConfigBundle.__version, len(entries)))
+                f.write(b''.join(index))
+                for name, contents, mtime, size in entries:
+                    f.write(contents)
+            os.chmod(tempPath, 0o644)
+            os.rename(tempPath, bundlePath)
+
+            # the rename modifies the directory, the bundle should not look
+            # older than it ({@link isFresh})
+            os.utime(bundlePath, None)
+        except (IOError, OSError):
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
+
+    def __entry(self, name):
+        """
+        Return a tuple (offset, length, mtime, size) for the entry name.
+        """
+        if name not in self.__index:
+            raise InvalidConfigBundleError(
+                'Invalid entry "{0}" in bundle "{1}"'.format(name, self.path())
+            )
+
+        return self.__index[name]
+
+    def __readIndex(self):
+        """
+        Read the index from the bundle.
+        """
+        if len(self.__data) < self.__headerStruct.size:
+            raise InvalidConfigBundleError(
+                'Invalid bundle "{0}"'.format(self.path())
+            )
+
+        magic, version, count = self.__headerStruct.unpack_from(self.__data, 0)
+        if magic != self.__magic or version != self.__version:
+            raise InvalidConfigBundleError(
+                'Unsupported bundle "{0}"'.format(self.path())
+            )
+
+        position = self.__headerStruct.size
+        for index in range(count):
+            nameLength = self.__nameStruct.unpack_from(self.__data, position)[0]
+            position += self.__nameStruct.size
+
+            name = self.__data[position:position + nameLength].decode('utf_8')
+            position += nameLength
+
+            self.__index[name] = self.__entryStruct.unpack_from(self.__data, position)
+            position += self.__entryStruct.size
@@ -1,21 +1,66 @@
+import os
 import json
+import hashlib
 from .Loader import Loader
 from ..EnvModifier import EnvModifier
+from ..Cache import LoaderCache
+from ..Timings import Timings
+
+# compatibility with python 2/3
+try:
+    basestring
+except NameError:
+    basestring = str
 
 class UnexpecteJsonContentError(Exception):
     """Unexpected json content error."""
 
+class InvalidIncludeError(Exception):
+    """Invalid include error."""
+
 class JsonLoader(Loader):
     """
     Json launcher loader.
     """
 
-    def loadFromJson(self, jsonContents):
+    # process wide cache used to store the state parsed from the json files
+    __loaderCache = None
+    __loaderCacheCreated = False
+
+    def __init__(self, software, strict=False):
+        """
+        Create a json loader.
+
+        By default the env of the addons is only parsed when the addon gets
+        enabled. In strict mode all addons are parsed upfront, so any error
+        found in their contents is raised during the load.
+        """
+        super(JsonLoader, self).__init__(software)
+
+        self.__strict = strict
+        self.__includes = []
+        self.__includedFilePaths = []
+        self.__digest = None
+        self.__loadedDigests = []
+        self.__configBundle = None
+        self.__configBundleDir = None
+
+    def isStrict(self):
+        """
+        Return a boolean telling if all addons are parsed during the load.
+        """
+        return self.__strict
+
+    def loadFromJson(self, jsonContents, includeDir=None):
         """
         Load a launcher information from json.
 
         Expected format:
         {
+          "extends": "base.json",
+          "include": [
+            "fragments/python.json"
+          ],
           "launcherType": "bin",
           "config": {
             "executable": "/usr/bin/foo"
@@ -39,7 +84,12 @@ class JsonLoader(Loader):
             },
             "unset": [
               "..."
-            ]
+            ],
+            "pathlist": {
+              "PYTHONPATH": {
+                "normalize": true
+              }
+            }
           },
           "addons": {
             "name": {
@@ -53,32 +103,328 @@ class JsonLoader(Loader):
             }
           }
         }
+
+        The "extends" and "include" entries reference fragments (json files
+        using the same format, where the launcher type is optional). Relative
+        paths are resolved from the include dir (by default the current dir).
+        The fragments are loaded before the contents, in order, so the contents
+        take precedence over them. The env of a fragment is added as a shared
+        layer ({@link addSoftwareEnvLayer}) and the addons defined by a fragment
+        are used unless they are defined again.
+        """
+        # parsing the contents through a brand new loader, so the
+        # fragments can be loaded before them
+        loader = JsonLoader(self.software(), self.isStrict())
+        with Timings.phase('config.parse'):
+            loader.__loadContents(json.loads(jsonContents), includeDir, False)
+            loader.__digest = self.__contentsDigest(jsonContents)
+
+        self.__loadState(loader.__state(), [])
+
+    def loadFromJsonFile(self, jsonFilePath):
+        """
+        Load the launcher information from a json file.
+
+        The state parsed from the file is cached ({@link loaderCache}), so
+        unmodified files don't need to be parsed again. Each included fragment
+        is cached on its own, so modifying a fragment affects all configurations
+        including it.
+
+        {@link loadFromJson}
+        """
+        self.__loadState(
+            self.__fileState(jsonFilePath, False),
+            [os.path.abspath(jsonFilePath)]
+        )
+
+    def setConfigBundle(self, configBundle, configDir=None):
+        """
+        Set a bundle used to read the json files (None disables it).
+
+        The files found under the config dir (by default the directory
+        containing the bundle) are read from the bundle rather than from disk,
+        the configurations and the fragments included by them alike. Files that
+        are not part of the bundle are still read from disk. The bundle is
+        trusted, its entries are not validated against the files
+        ({@link ConfigBundle.outdatedNames}).
+        """
+        if configBundle is not None and configDir is None:
+            configDir = os.path.dirname(configBundle.path())
+
+        self.__configBundle = configBundle
+        self.__configBundleDir = None if configDir is None else os.path.abspath(configDir)
+
+    def configBundle(self):
+        """
+        Return the bundle used to read the json files (None when not used).
+        """
+        return self.__configBundle
+
+    def contentsDigest(self):
+        """
+        Return a digest of the contents loaded (the configuration and all fragments included by it).
+
+        The digests are computed when the contents are parsed (and cached along
+        with the state), so they don't require the files to be read again.
+        """
+        return hashlib.sha1(''.join(self.__loadedDigests).encode('utf_8')).hexdigest()
+
+    def includedFilePaths(self):
+        """
+        Return a list of the fragment files (absolute paths) included by the loaded contents.
+
+        It contains the fragments included indirectly as well, in the order
+        they have been loaded.
+        """
+        return list(self.__includedFilePaths)
+
+    @staticmethod
+    def loaderCache():
+        """
+        Return the cache used to store the state parsed from the json files (None when disabled).
+
+        By default it's created through {@link LoaderCache.createDefault}.
+        """
+        if not JsonLoader.__loaderCacheCreated:
+            JsonLoader.setLoaderCache(LoaderCache.createDefault())
+
+        return JsonLoader.__loaderCache
+
+    @staticmethod
+    def setLoaderCache(loaderCache):
+        """
+        Set the cache used to store the state parsed from the json files (None disables it).
+        """
+        assert loaderCache is None or isinstance(loaderCache, LoaderCache), \
+            "Invalid LoaderCache type!"
+
+        JsonLoader.__loaderCache = loaderCache
+        JsonLoader.__loaderCacheCreated = True
+
+    def __state(self):
+        """
+        Return a dict containing the state of the loader.
+        """
+        return {
+            'launcherType': self.launcherType(),
+            'config': dict((name, self.launcherConfig(name)) for name in self.launcherConfigNames()),
+            'softwareEnvModifier': self.softwareEnvModifier(),
+            'addonsEnvModifier': dict(
+                (name, self.addonEnvModifier(name)) for name in self.addonEnvModifierNames()
+                if name not in self._addonEnvDataNames()
+            ),
+            'addonsEnvData': dict((name, self._addonEnvData(name)) for name in self._addonEnvDataNames()),
+            'includes': list(self.__includes),
+            'digest': self.__digest
+        }
+
+    def __loadState(self, state, includeStack):
+        """
+        Load the state of a loader, it has the same effect as parsing the contents again.
+
+        The env modifiers are copied, since the state can be shared. The
+        fragments included by the state are loaded first.
         """
-        contents = json.loads(jsonContents)
+        for fragmentPath in state['includes']:
+            self.__includeFragment(fragmentPath, includeStack)
+
+        self.__loadedDigests.append(state['digest'])
+
+        if state['launcherType'] is not None:
+            self.setLauncherType(state['launcherType'])
+
+        for configName, configValue in state['config'].items():
+            self.setLauncherConfig(configName, configValue)
+
+        self.softwareEnvModifier().addFromEnvModifier(state['softwareEnvModifier'])
+
+        for addonName, addonEnvModifier in state['addonsEnvModifier'].items():
+            envModifier = EnvModifier()
+            envModifier.addFromEnvModifier(addonEnvModifier)
+            self.setAddonEnvModifier(addonName, envModifier)
+
+        for addonName, addonEnvData in state['addonsEnvData'].items():
+            self._setAddonEnvData(addonName, addonEnvData)
+
+        if self.isStrict():
+            self.__createAddonEnvModifiers()
+
+    def __fileState(self, jsonFilePath, isFragment):
+        """
+        Return the state parsed from a json file (through the loader cache).
+
+        The state only contains what is defined by the file itself, the
+        fragments included by it are listed under "includes".
+        """
+        # files found in the bundle are validated against the bundle
+        # itself (no need to query the file)
+        bundleName = self.__bundleName(jsonFilePath)
+        signature = None
+        if bundleName is not None:
+            signature = ('bundle',) + self.__configBundle.signature(bundleName)
+
+        loaderCache = self.loaderCache()
+        state = None
+        if loaderCache is not None:
+            state = loaderCache.state(jsonFilePath, signature)
 
+        if state is None:
+            if loaderCache is not None and signature is None:
+                signature = loaderCache.fileSignature(jsonFilePath)
+
+            # parsing the file through a brand new loader, so the state
+            # only contains what comes from the file
+            loader = JsonLoader(self.software(), self.isStrict())
+            with Timings.phase('config.parse', filePath=jsonFilePath, bundled=bundleName is not None):
+                if bundleName is not None:
+                    jsonContents = self.__configBundle.contents(bundleName)
+                else:
+                    with open(jsonFilePath, 'rb') as f:
+                        jsonContents = f.read()
+
+                loader.__loadContents(
+                    json.loads(jsonContents.decode('utf_8')),
+                    os.path.dirname(os.path.abspath(jsonFilePath)),
+                    isFragment
+                )
+                loader.__digest = self.__contentsDigest(jsonContents)
+
+            state = loader.__state()
+            if loaderCache is not None:
+                loaderCache.setState(jsonFilePath, state, signature)
+
+        return state
+
+    def __includeFragment(self, fragmentPath, includeStack):
+        """
+        Load the fragment file, including the fragments included by it first.
+
+        The include stack contains the files being loaded, it's used to detect
+        circular includes. Fragments that have been already included are skipped.
+        """
+        if fragmentPath in includeStack:
+            raise InvalidIncludeError(
+                'Circular include "{0}"'.format(fragmentPath)
+            )
+
+        if fragmentPath in self.__includedFilePaths:
+            return
+
+        if self.__bundleName(fragmentPath) is None and not os.path.isfile(fragmentPath):
+            raise InvalidIncludeError(
+                'Could not find the included file "{0}"'.format(fragmentPath)
+            )
+
+        state = self.__fileState(fragmentPath, True)
+        for includePath in state['includes']:
+            self.__includeFragment(includePath, includeStack + [fragmentPath])
+
+        self.__includedFilePaths.append(fragmentPath)
+        self.__loadedDigests.append(state['digest'])
+
+        if state['launcherType'] is not None:
+            self.setLauncherType(state['launcherType'])
+
+        for configName, configValue in state['config'].items():
+            self.setLauncherConfig(configName, configValue)
+
+        # the env modifier of the fragment is shared by all
+        # configurations including it
+        self.addSoftwareEnvLayer(state['softwareEnvModifier'])
+
+        for addonName, addonEnvModifier in state['addonsEnvModifier'].items():
+            envModifier = EnvModifier()
+            envModifier.addFromEnvModifier(addonEnvModifier)
+            self.setAddonEnvModifier(addonName, envModifier)
+
+        for addonName, addonEnvData in state['addonsEnvData'].items():
+            self._setAddonEnvData(addonName, addonEnvData)
+
+    def __bundleName(self, jsonFilePath):
+        """
+        Return the name used by the bundle for the json file (None when the file is not bundled).
+        """
+        if self.__configBundle is None:
+            return None
+
+        name = os.path.relpath(
+            os.path.abspath(jsonFilePath),
+            self.__configBundleDir
+        ).replace(os.sep, '/')
+
+        if not self.__configBundle.hasName(name):
+            return None
+
+        return name
+
+    @staticmethod
+    def __contentsDigest(jsonContents):
+        """
+        Return a digest for the json contents (bytes or string).
+        """
+        if not isinstance(jsonContents, bytes):
+            jsonContents = jsonContents.encode('utf_8')
+
+        return hashlib.sha1(jsonContents).hexdigest()
+
+    def __createAddonEnvModifiers(self):
+        """
+        Create the env modifiers for all addons that have been deferred.
+        """
+        for addonName in self._addonEnvDataNames():
+            self.addonEnvModifier(addonName)
+
+    def __loadContents(self, contents, includeDir, isFragment):
+        """
+        Load the contents, the fragments are only listed (not loaded).
+        """
         # root checking
         if not isinstance(contents, dict):
             raise UnexpecteJsonContentError('Expecting object as root!')
 
-        # launcher type
-        if 'launcherType' not in contents:
-            raise UnexpecteJsonContentError('Expecting luncher type!')
+        self.__parseIncludeContents(contents, includeDir)
 
-        self.setLauncherType(contents['launcherType'])
+        # launcher type (it can come from the fragments)
+        if 'launcherType' in contents:
+            self.setLauncherType(contents['launcherType'])
+        elif not (isFragment or self.__includes):
+            raise UnexpecteJsonContentError('Expecting luncher type!')
 
         self.__parseConfigContents(contents)
         self.__parseEnvContents(contents)
         self.__parseAddonContents(contents)
 
-    def loadFromJsonFile(self, jsonFilePath):
+    def __parseIncludeContents(self, contents, includeDir):
         """
-        Load the launcher information from a json file.
-
-        {@link loadFromJson}
+        Parse the fragments referenced by the contents ("extends" followed by "include").
         """
-        with open(jsonFilePath, 'r') as f:
-            contents = '\n'.join(f.readlines())
-            self.loadFromJson(contents)
+        includes = []
+        if 'extends' in contents:
+            if not isinstance(contents['extends'], basestring):
+                raise UnexpecteJsonContentError(
+                    'Expecting a string for the extends!'
+                )
+            includes.append(contents['extends'])
+
+        if 'include' in contents:
+            if not isinstance(contents['include'], list):
+                raise UnexpecteJsonContentError(
+                    'Expecting an array for the include!'
+                )
+            includes += contents['include']
+
+        if includeDir is None:
+            includeDir = os.getcwd()
+
+        for includePath in includes:
+            if not isinstance(includePath, basestring):
+                raise UnexpecteJsonContentError(
+                    'Expecting a string for the included file!'
+                )
+
+            self.__includes.append(
+                os.path.normpath(os.path.join(includeDir, includePath))
+            )
 
     def __parseConfigContents(self, contents):
         """
@@ -120,11 +466,21 @@ class JsonLoader(Loader):
                         'Expecting an object for the addon!'
                     )
 
+                # the env is only parsed when the addon is needed
                 if 'env' in contents['addons'][addonName]:
-                    addonEnv = contents['addons'][addonName]['env']
-                    addonEnvModifier = EnvModifier()
-                    self.__parseEnv(addonEnv, addonEnvModifier)
-                    self.setAddonEnvModifier(addonName, addonEnvModifier)
+                    self._setAddonEnvData(addonName, contents['addons'][addonName]['env'])
+
+            if self.isStrict():
+                self.__createAddonEnvModifiers()
+
+    def _createAddonEnvModifier(self, data):
+        """
+        Return an env modifier created from the env contents of an addon.
+        """
+        addonEnvModifier = EnvModifier()
+        self.__parseEnv(data, addonEnvModifier)
+
+        return addonEnvModifier
 
     def __parseEnv(self, data, envModifier):
         """
@@ -139,6 +495,7 @@ class JsonLoader(Loader):
         self.__parseAppend(data, envModifier)
         self.__parseOverride(data, envModifier)
         self.__parseUnset(data, envModifier)
+        self.__parsePathList(data, envModifier)
 
     def __parsePrepend(self, data, envModifier):
         """
@@ -195,3 +552,21 @@ class JsonLoader(Loader):
                 )
             for varName in data['unset']:
                 envModifier.addUnsetVar(varName)
+
+    def __parsePathList(self, data, envModifier):
+        """
+        Parse the path list data to the endModifier.
+
+        @private
+        """
+        if 'pathlist' in data:
+            if not isinstance(data['pathlist'], dict):
+                raise UnexpecteJsonContentError(
+                    'Expecting an object to describe the path list vars!'
+                )
+            for varName, options in data['pathlist'].items():
+                if not isinstance(options, dict):
+                    raise UnexpecteJsonContentError(
+                        'Expecting an object to describe the path list options!'
+                    )
+                envModifier.setPathListVar(varName, **options)
@@ -1,5 +1,6 @@
 import uver
 from ..EnvModifier import EnvModifier
+from ..LayeredEnvModifier import LayeredEnvModifier
 from ..Launcher import Launcher
 
 # compatibility with python 2/3
@@ -23,7 +24,9 @@ class Loader(object):
         self.__launcherType = None
         self.__launcherConfig = {}
         self.__softwareEnvModifier = EnvModifier()
+        self.__softwareEnvLayers = []
         self.__addonsEnvModifier = {}
+        self.__addonsEnvData = {}
         self.__setSoftware(software)
 
     def software(self):
@@ -41,12 +44,30 @@ class Loader(object):
 
         self.__launcherType = registeredType
 
+    def launcherType(self):
+        """
+        Return the type of launcher (None when not defined).
+        """
+        return self.__launcherType
+
     def setLauncherConfig(self, name, value):
         """
         Set a configuration for the launcher.
         """
         self.__launcherConfig[name] = value
 
+    def launcherConfig(self, name):
+        """
+        Return the value for a configuration of the launcher.
+        """
+        return self.__launcherConfig[name]
+
+    def launcherConfigNames(self):
+        """
+        Return a list of configuration names for the launcher.
+        """
+        return self.__launcherConfig.keys()
+
     def setAddonEnvModifier(self, addonName, envModifier):
         """
         Set an env modifier for the input addon name.
@@ -58,6 +79,28 @@ class Loader(object):
             "Invalid EnvModifier Type!"
 
         self.__addonsEnvModifier[addonName] = envModifier
+        self.__addonsEnvData.pop(addonName, None)
+
+    def addonEnvModifier(self, addonName):
+        """
+        Return the env modifier for the input addon name.
+
+        For addons defined through raw env data ({@link _setAddonEnvData}) the
+        env modifier gets created on demand.
+        """
+        if addonName in self.__addonsEnvData:
+            self.setAddonEnvModifier(
+                addonName,
+                self._createAddonEnvModifier(self.__addonsEnvData[addonName])
+            )
+
+        return self.__addonsEnvModifier[addonName]
+
+    def addonEnvModifierNames(self):
+        """
+        Return a list of addon names that have an env modifier.
+        """
+        return list(self.__addonsEnvModifier.keys()) + list(self.__addonsEnvData.keys())
 
     def softwareEnvModifier(self):
         """
@@ -65,40 +108,109 @@ class Loader(object):
         """
         return self.__softwareEnvModifier
 
-    def launcher(self, env={}):
+    def addSoftwareEnvLayer(self, envModifier):
         """
-        Return a launcher instance.
+        Add an env modifier that sits below the software env modifier.
+
+        The env modifier is referenced rather than copied, so it can be shared
+        among loaders (for instance the env of a fragment included by many
+        configurations). Layers added later take precedence.
         """
-        if not self.__launcherType:
-            raise MissingLauncherTypeError(
-                'Could not parse launcher, missing launcher type!'
-            )
+        assert isinstance(envModifier, EnvModifier), \
+            "Invalid EnvModifier Type!"
 
-        finalEnv = EnvModifier(env)
+        self.__softwareEnvLayers.append(envModifier)
 
-        # software env
-        finalEnv.addFromEnvModifier(self.softwareEnvModifier())
+    def softwareEnvLayers(self):
+        """
+        Return a list of the env modifiers used below the software env modifier.
+        """
+        return list(self.__softwareEnvLayers)
 
-        # addon env
+    def enabledAddonNames(self):
+        """
+        Return a list of the addon names enabled for the software.
+        """
+        result = []
         for addonName in self.software().addonNames():
-
-            # checking if addon is enabled
             addon = self.software().addon(addonName)
-            enabled = False
             if 'enabled' in addon.optionNames() and addon.option('enabled'):
-                enabled = True
+                result.append(addonName)
 
-            # including addon env to the final env
-            if enabled and addonName in self.__addonsEnvModifier:
-                finalEnv.addFromEnvModifier(self.__addonsEnvModifier[addonName])
+        return result
+
+    def envModifier(self, env={}):
+        """
+        Return an env modifier combining the software and the enabled addons modifications.
+        """
+        # the modifiers are stacked as layers, which only get merged
+        # when the environment is generated
+        result = LayeredEnvModifier(env)
+
+        # software env
+        for envModifier in self.__softwareEnvLayers:
+            result.addLayer(envModifier)
+        result.addLayer(self.softwareEnvModifier())
+
+        # addon env
+        for addonName in self.enabledAddonNames():
+            if addonName in self.__addonsEnvModifier or addonName in self.__addonsEnvData:
+                result.addLayer(self.addonEnvModifier(addonName))
+
+        return result
+
+    def launcher(self, env={}):
+        """
+        Return a launcher instance.
+        """
+        return self.createLauncher(self.envModifier(env).generate())
+
+    def createLauncher(self, launcherEnv):
+        """
+        Return a launcher instance that uses the environment as it is.
+        """
+        if not self.__launcherType:
+            raise MissingLauncherTypeError(
+                'Could not parse launcher, missing launcher type!'
+            )
 
         return Launcher.create(
             self.__launcherType,
             self.software(),
-            finalEnv.generate(),
+            launcherEnv,
             self.__launcherConfig
         )
 
+    def _setAddonEnvData(self, addonName, data):
+        """
+        Set the raw env data for the input addon name.
+
+        The env modifier for the addon is only created when it's needed
+        (for instance when the addon is enabled), through {@link _createAddonEnvModifier}.
+        """
+        self.__addonsEnvModifier.pop(addonName, None)
+        self.__addonsEnvData[addonName] = data
+
+    def _addonEnvData(self, addonName):
+        """
+        Return the raw env data for an addon that has not been created yet.
+        """
+        return self.__addonsEnvData[addonName]
+
+    def _addonEnvDataNames(self):
+        """
+        Return a list of addon names which the env modifiers have not been created yet.
+        """
+        return list(self.__addonsEnvData.keys())
+
+    def _createAddonEnvModifier(self, data):
+        """
+        Return an env modifier created from the raw env data of an addon.
+
+        Should be re-implemented by derived classes that use {@link _setAddonEnvData}.
+        """
+        raise NotImplementedError
+
     def __setSoftware(self, software):
         """
         Set the software that should be associated with the loader.
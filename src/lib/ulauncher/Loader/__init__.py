@@ -1,2 +1,3 @@
 from .Loader import Loader, MissingLauncherTypeError
-from .JsonLoader import JsonLoader, UnexpecteJsonContentError
+from .JsonLoader import JsonLoader, UnexpecteJsonContentError, InvalidIncludeError
+from .ConfigBundle import ConfigBundle, InvalidConfigBundleError
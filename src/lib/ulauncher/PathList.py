@@ -0,0 +1,91 @@
+import os
+
+# compatibility with python 2/3
+try:
+    basestring
+except NameError:
+    basestring = str
+
+class PathList(object):
+    """
+    Ordered list of unique paths used by PATH like variables.
+
+    Paths keep the order of their first occurrence, duplicated and empty
+    entries are dropped. The lookup is backed by a set, so merging lists
+    is linear to the number of paths.
+    """
+
+    def __init__(self, normalize=False, separator=':'):
+        """
+        Create a path list object.
+
+        When normalize is enabled the paths are normalized (os.path.normpath)
+        before being compared and stored.
+        """
+        self.__paths = []
+        self.__pathSet = set()
+        self.__normalize = normalize
+        self.__separator = separator
+
+    def normalize(self):
+        """
+        Return a boolean telling if the paths are normalized.
+        """
+        return self.__normalize
+
+    def separator(self):
+        """
+        Return the separator used between the paths.
+        """
+        return self.__separator
+
+    def add(self, path):
+        """
+        Add a path to the end of the list (ignored when already in the list).
+        """
+        if not path:
+            return
+
+        if self.normalize():
+            path = os.path.normpath(path)
+
+        if path not in self.__pathSet:
+            self.__pathSet.add(path)
+            self.__paths.append(path)
+
+    def extend(self, paths):
+        """
+        Add a list of paths or a string containing paths split by the separator.
+        """
+        if isinstance(paths, basestring):
+            paths = paths.split(self.separator())
+
+        for path in paths:
+            self.add(path)
+
+    def paths(self):
+        """
+        Return a list of the paths.
+        """
+        return list(self.__paths)
+
+    def value(self):
+        """
+        Return a string containing the paths joined by the separator.
+        """
+        return self.separator().join(self.__paths)
+
+    def __contains__(self, path):
+        """
+        Return a boolean telling if the path is in the list.
+        """
+        if self.normalize() and path:
+            path = os.path.normpath(path)
+
+        return path in self.__pathSet
+
+    def __len__(self):
+        """
+        Return the number of paths.
+        """
+        return len(self.__paths)
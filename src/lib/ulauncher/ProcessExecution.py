@@ -1,27 +1,79 @@
-import re
+import os
+import errno
 import sys
+import time
+import fcntl
+import codecs
 import select
+import signal
 import subprocess
+from .Capture import Capture
+from .ProcessTelemetry import ProcessTelemetry
+from .Timings import Timings
+
+# compatibility with python 2/3
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
+try:
+    from shlex import quote as shellQuote
+except ImportError:
+    from pipes import quote as shellQuote
+
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
 
 class ProcessExecution(object):
     """
     Executes a process.
     """
 
-    # regex: any alpha numeric, underscore and dash characters are allowed.
-    __validateShellArgRegex = re.compile("^[\w_-]*$")
+    # maximum number of bytes read from a stream at once
+    __chunkSize = 65536
 
-    def __init__(self, args, env={}, shell=True, cwd=None, redirectStderrToStdout=False):
+    # interval (in seconds) used to check if the process is still alive
+    # while waiting for output
+    __pollInterval = 0.5
+
+    def __init__(self, args, env={}, shell=True, cwd=None, redirectStderrToStdout=False, stdoutCapture=None, stderrCapture=None, passthrough=False, relay=True, telemetry=None):
         """
         Create a ProcessExecution object.
 
         The constructor signature tries mimic the features available by subprocess.Popen.
-        """
-        self.__stdout = []
-        self.__stderr = []
+        Without shell the executable is looked up in the PATH of the env and
+        spawned directly (through posix_spawn when the platform supports it).
+        The captures ({@link Capture}) define what is kept from the output
+        streams, by default they are created through {@link Capture.createDefault}.
+        In passthrough mode the process inherits the stdout and stderr of the
+        current process, so nothing is relayed or captured. The relay tells if
+        the output should be written to the system's streams. The telemetry
+        ({@link ProcessTelemetry}) collects the resource usage of the process,
+        by default it's created through {@link ProcessTelemetry.createDefault}.
+        """
+        if stdoutCapture is None:
+            stdoutCapture = Capture.createDefault()
+
+        if stderrCapture is None:
+            stderrCapture = Capture.createDefault()
+
+        assert isinstance(stdoutCapture, Capture) and isinstance(stderrCapture, Capture), \
+            "Invalid Capture type!"
+
+        self.__stdout = stdoutCapture
+        self.__stderr = stderrCapture
         self.__shell = shell
         self.__cwd = cwd
         self.__redirectStderrToStdout = redirectStderrToStdout
+        self.__passthrough = passthrough
+        self.__relay = relay
+        self.__deadline = None
+        self.__timedOut = False
+        self.__hasOutput = False
+        self.__telemetry = ProcessTelemetry.createDefault() if telemetry is None else telemetry
 
         self.__setArgs(args)
         self.__setEnv(env)
@@ -53,13 +105,25 @@ class ProcessExecution(object):
 
     def stderr(self):
         """
-        Return a list of stderr messages.
+        Return the stderr data (bytes) kept by the stderr capture.
         """
-        return self.__stderr
+        return self.__stderr.data()
 
     def stdout(self):
         """
-        Return a list of stdout messages.
+        Return the stdout data (bytes) kept by the stdout capture.
+        """
+        return self.__stdout.data()
+
+    def stderrCapture(self):
+        """
+        Return the capture used by the stderr stream.
+        """
+        return self.__stderr
+
+    def stdoutCapture(self):
+        """
+        Return the capture used by the stdout stream.
         """
         return self.__stdout
 
@@ -69,6 +133,24 @@ class ProcessExecution(object):
         """
         return self.__redirectStderrToStdout
 
+    def isPassthrough(self):
+        """
+        Return a boolean telling if the process inherits the output streams (nothing is captured).
+        """
+        return self.__passthrough
+
+    def telemetry(self):
+        """
+        Return the telemetry about the resource usage of the process (None when disabled).
+        """
+        return self.__telemetry
+
+    def timedOut(self):
+        """
+        Return a boolean telling if the process has been killed for exceeding the timeout.
+        """
+        return self.__timedOut
+
     def executionSuccess(self):
         """
         Return a boolean if the execution has been sucessfull.
@@ -87,68 +169,258 @@ class ProcessExecution(object):
         """
         return self.__process.pid
 
-    def execute(self):
+    def execute(self, timeout=None):
         """
         Execute the process.
+
+        The output is relayed to the system's streams in realtime while it
+        gets captured. The streams are read in chunks as soon as data is
+        available (regardless of newlines) and the chunks read in the same
+        round are written at once. In passthrough mode it only waits for
+        the process to finish. The process is killed when it runs for
+        longer than the timeout (in seconds).
         """
+        if timeout is not None:
+            self.__deadline = time.time() + timeout
+
+        if self.isPassthrough():
+            self.__waitProcess()
+            return
+
         # we want all stream messages to keep going
         # up to system's stream in realtime, instead of
         # showing them only when execution is done
         # (subprocess/communicate default behaviour)
         # https://stackoverflow.com/questions/12270645
-        while True:
-            hasOutput = False
-            reads = [
-                self.__process.stdout.fileno()
-            ]
+        relays = {
+            self.__process.stdout.fileno(): (
+                self.__stdout,
+                sys.stdout,
+                codecs.getincrementaldecoder('utf_8')('replace')
+            )
+        }
 
-            if self.__process.stderr:
-                reads.append(self.__process.stderr.fileno())
+        if self.__process.stderr:
+            relays[self.__process.stderr.fileno()] = (
+                self.__stderr,
+                sys.stderr,
+                codecs.getincrementaldecoder('utf_8')('replace')
+            )
 
-            try:
-                hasOutput = self.__readProcessOutput(reads)
+        for fd in relays.keys():
+            self.__setNonBlocking(fd)
 
-            except KeyboardInterrupt:
-                reason = ' KeyboardInterrupt\n'
-                sys.stderr.write(reason)
-                self.__stderr.append(reason)
-                break
+        try:
+            self.__relayProcessOutput(relays)
 
-            if not hasOutput and self.__process.poll() is not None:
-                break
+        except KeyboardInterrupt:
+            reason = ' KeyboardInterrupt\n'
+            sys.stderr.write(reason)
+            self.__stderr.write(reason.encode('utf_8'))
+
+        self.__waitExit()
 
         # closing streams
         self.__process.stdout.close()
         if self.__process.stderr:
             self.__process.stderr.close()
 
-    def __readProcessOutput(self, reads):
+        self.__stdout.close()
+        self.__stderr.close()
+
+    def __waitProcess(self):
         """
-        Read the process output by looking at stdout and stderr.
+        Wait for the process to finish (used by the passthrough mode).
 
-        Return a boolean telling if the process has printed any information
-        through stdout or stderr.
+        The process receives the keyboard interrupt as well, so it's still
+        waited to collect its exit status.
         """
-        hasOutput = False
-        ret = select.select(reads, [], [])
-        for fd in ret[0]:
-            if fd == self.__process.stdout.fileno():
-                read = self.__streamValue(self.__process.stdout)
-                sys.stdout.write(read)
-                self.__stdout.append(read)
+        while True:
+            try:
+                while self.__deadline is not None and self.__pollExit() is None:
+                    self.__checkTimeout()
+                    time.sleep(0.05)
+
+                self.__waitExit()
+                break
 
-                if len(read):
-                    hasOutput = True
+            except KeyboardInterrupt:
+                reason = ' KeyboardInterrupt\n'
+                sys.stderr.write(reason)
+                self.__stderr.write(reason.encode('utf_8'))
+
+        self.__stdout.close()
+        self.__stderr.close()
+
+    def __relayProcessOutput(self, relays):
+        """
+        Relay the output of the process until its streams are closed.
+
+        In case the process is gone but its streams are still open (held by
+        processes spawned by it), the output available is drained and the
+        relay stops.
+        """
+        pending = set(relays.keys())
+        selector = selectors.DefaultSelector() if selectors else None
+        if selector:
+            for fd in pending:
+                selector.register(fd, selectors.EVENT_READ)
 
-            if self.__process.stderr and fd == self.__process.stderr.fileno():
-                read = self.__streamValue(self.__process.stderr)
-                sys.stderr.write(read)
-                self.__stderr.append(read)
+        try:
+            while pending:
+                self.__checkTimeout()
 
-                if len(read):
-                    hasOutput = True
+                processDone = self.__pollExit() is not None
+                readyFds = self.__readyFds(selector, pending, self.__relayTimeout(processDone))
+                if not readyFds and processDone:
+                    break
 
-        return hasOutput
+                self.__relayReadyFds(readyFds, relays, pending, selector)
+        finally:
+            if selector:
+                selector.close()
+
+    def __relayReadyFds(self, readyFds, relays, pending, selector):
+        """
+        Read and relay the output available in the ready file descriptors.
+
+        The file descriptors of the streams that have ended are removed from
+        the pending ones.
+        """
+        writes = {}
+        for fd in readyFds:
+            data = self.__readStream(fd)
+            if data is None:
+                continue
+
+            # end of the stream
+            if not data:
+                pending.discard(fd)
+                if selector:
+                    selector.unregister(fd)
+
+            self.__relayData(data, relays[fd], writes)
+
+        for stream, texts in writes.items():
+            stream.write(''.join(texts))
+            stream.flush()
+
+    def __relayTimeout(self, processDone):
+        """
+        Return how long the relay waits for the output (in seconds).
+        """
+        timeout = 0 if processDone else self.__pollInterval
+        if self.__deadline is not None and not self.__timedOut:
+            timeout = max(0, min(timeout, self.__deadline - time.time()))
+
+        return timeout
+
+    @staticmethod
+    def __readyFds(selector, pending, timeout):
+        """
+        Return a list of the pending file descriptors that are ready to be read.
+        """
+        if selector:
+            return [key.fd for key, events in selector.select(timeout)]
+
+        return select.select(list(pending), [], [], timeout)[0]
+
+    def __readStream(self, fd):
+        """
+        Return the data read from the file descriptor.
+
+        Returns None when nothing is available and empty bytes when the
+        stream has ended.
+        """
+        try:
+            return os.read(fd, self.__chunkSize)
+        except OSError as err:
+            # nothing available (non-blocking read)
+            if err.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return None
+
+            # treating any other error as the end of the stream
+            return b''
+
+    def __relayData(self, data, relay, writes):
+        """
+        Capture the data read from a stream and add its text to the writes of the relayed stream.
+        """
+        capture, stream, decoder = relay
+        if data:
+            capture.write(data)
+
+            if not self.__hasOutput:
+                self.__hasOutput = True
+                Timings.mark('process.firstOutput', pid=self.__process.pid)
+
+        if not self.__relay:
+            return
+
+        text = decoder.decode(data, final=not data)
+        if text:
+            writes.setdefault(stream, []).append(text)
+
+    def __checkTimeout(self):
+        """
+        Kill the process when the deadline has passed.
+        """
+        if self.__deadline is None or self.__timedOut or time.time() < self.__deadline:
+            return
+
+        if self.__pollExit() is None:
+            self.__timedOut = True
+
+            # not going through Popen.kill, it would reap the
+            # process (losing its rusage)
+            os.kill(self.__process.pid, signal.SIGKILL)
+
+    def __pollExit(self):
+        """
+        Return the exit status of the process (None while running).
+
+        With telemetry the process is reaped through os.wait4, so its rusage
+        is collected.
+        """
+        if self.__telemetry is None or self.__process.returncode is not None:
+            return self.__process.poll()
+
+        pid, status, rusage = os.wait4(self.__process.pid, os.WNOHANG)
+        if pid == 0:
+            return None
+
+        self.__setExitStatus(status, rusage)
+
+        return self.__process.returncode
+
+    def __waitExit(self):
+        """
+        Wait for the process to finish.
+        """
+        if self.__telemetry is None or self.__process.returncode is not None:
+            self.__process.wait()
+            return
+
+        while True:
+            try:
+                pid, status, rusage = os.wait4(self.__process.pid, 0)
+                break
+            except OSError as err:
+                if err.errno != errno.EINTR:
+                    raise
+
+        self.__setExitStatus(status, rusage)
+
+    def __setExitStatus(self, status, rusage):
+        """
+        Set the exit status of the process reaped through os.wait4 (following the subprocess convention).
+        """
+        if os.WIFSIGNALED(status):
+            self.__process.returncode = -os.WTERMSIG(status)
+        else:
+            self.__process.returncode = os.WEXITSTATUS(status)
+
+        self.__telemetry.stop(rusage)
 
     def __setArgs(self, args):
         """
@@ -168,42 +440,102 @@ class ProcessExecution(object):
         """
         Create a process that later should be executed through {@link run}.
         """
-        stderrStream = subprocess.STDOUT if self.redirectStderrToStdout() else subprocess.PIPE
+        with Timings.phase('process.spawn', args=self.args(), shell=self.isShell()) as phase:
+            self.__spawnProcess()
+            phase.setArg('pid', self.__process.pid)
+
+        if self.__telemetry is not None:
+            self.__telemetry.start(self.__process.pid)
+
+    def __spawnProcess(self):
+        """
+        Spawn the process.
+        """
+        stdoutStream = None if self.isPassthrough() else subprocess.PIPE
+        stderrStream = subprocess.STDOUT if self.redirectStderrToStdout() else stdoutStream
+
+        if self.isShell():
+            self.__process = subprocess.Popen(
+                self.shellCommand(self.args()),
+                stdout=stdoutStream,
+                stderr=stderrStream,
+                shell=True,
+                env=self.env(),
+                cwd=self.cwd()
+            )
+            return
 
-        executableArgs = ' '.join(map(str, self.__sanitizeShellArgs(self.args()))) if self.isShell() else self.args()
+        # subprocess uses posix_spawn (rather than fork + exec) when the
+        # executable is an absolute path and the fds are not closed, the fds
+        # created by python are not inheritable anyway (PEP 446)
+        args = list(map(str, self.args()))
         self.__process = subprocess.Popen(
-            executableArgs,
-            stdout=subprocess.PIPE,
+            args,
+            executable=self.findExecutable(args[0], self.env()),
+            stdout=stdoutStream,
             stderr=stderrStream,
-            shell=self.isShell(),
+            close_fds=sys.version_info[0] < 3,
             env=self.env(),
             cwd=self.cwd()
         )
 
     @staticmethod
-    def __streamValue(stream):
+    def handOff(args, env={}, shell=True, cwd=None):
         """
-        Return a string value from the stream.
+        Replace the current process by the process described by the args (os.execve).
+
+        It never returns, the process keeps the pid and the output streams of
+        the current process. Nothing is captured and the exit status goes
+        straight to the parent of the current process.
         """
-        read = stream.readline()
-        if not isinstance(read, str):
-            read = read.decode("utf_8")
-        return read
+        assert isinstance(args, list), "Invalid args list!"
+
+        if cwd:
+            os.chdir(cwd)
+
+        # the timings would be lost otherwise
+        timings = Timings.current()
+        if timings is not None:
+            Timings.mark('process.handOff')
+            timings.write()
+
+        # making sure nothing written so far gets lost
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        if shell:
+            os.execve('/bin/sh', ['/bin/sh', '-c', ProcessExecution.shellCommand(args)], dict(env))
+        else:
+            args = list(map(str, args))
+            os.execve(ProcessExecution.findExecutable(args[0], env) or args[0], args, dict(env))
 
     @staticmethod
-    def __sanitizeShellArgs(args):
+    def findExecutable(name, env):
+        """
+        Return the path for the executable looked up in the PATH of the env (None when not found).
         """
-        Sanitize shell args by escaping shell special characters.
+        if os.sep in name:
+            return name
+
+        return which(name, path=env.get('PATH', os.defpath))
+
+    @staticmethod
+    def shellCommand(args):
         """
-        result = []
+        Return the shell command line for the args.
 
-        for index, arg in enumerate(args):
+        The first argument is used as it is, so it can contain shell syntax.
+        The other arguments are quoted, so they reach the process untouched
+        (including spaces, quotes and "$").
+        """
+        args = list(map(str, args))
 
-            # we need to avoid to escape the first argument otherwise, it will be
-            # interpreted as string rather than a command.
-            if index == 0 or ProcessExecution.__validateShellArgRegex.match(arg):
-                result.append(arg)
-            else:
-                result.append('"{}"'.format(arg.replace('"', '\\"')))
+        return ' '.join(args[:1] + [shellQuote(arg) for arg in args[1:]])
 
-        return result
+    @staticmethod
+    def __setNonBlocking(fd):
+        """
+        Make the reads from the file descriptor non-blocking.
+        """
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
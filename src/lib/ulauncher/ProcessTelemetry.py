@@ -0,0 +1,292 @@
+import os
+import time
+import threading
+
+class ProcessTelemetry(object):
+    """
+    Collects the resource usage of a process and its descendants.
+
+    The process tree is sampled from /proc at a fixed interval (RSS and I/O),
+    while the cpu time of the process comes from the rusage reported when it's
+    reaped (os.wait4). Processes that finish between two samples only
+    contribute with what was seen by the last sample.
+    """
+
+    __procDir = '/proc'
+
+    def __init__(self, interval=1.0):
+        """
+        Create a process telemetry object sampling at the interval (in seconds).
+        """
+        assert interval > 0, "Invalid interval!"
+
+        self.__interval = interval
+        self.__pid = None
+        self.__startTime = None
+        self.__endTime = None
+        self.__rusage = None
+        self.__thread = None
+        self.__stopEvent = threading.Event()
+
+        # per process values from the last sample, it keeps the
+        # processes that are gone so their usage is not lost
+        self.__processCpuTicks = {}
+        self.__processIo = {}
+        self.__peakTreeRss = 0
+        self.__sampleCount = 0
+
+    def interval(self):
+        """
+        Return the number of seconds between the samples of the process tree.
+        """
+        return self.__interval
+
+    def pid(self):
+        """
+        Return the id of the process being watched (None when not started).
+        """
+        return self.__pid
+
+    def start(self, pid):
+        """
+        Start watching the process.
+        """
+        self.__pid = pid
+        self.__startTime = time.time()
+
+        if os.path.isdir(os.path.join(self.__procDir, str(pid))):
+            self.__thread = threading.Thread(target=self.__sampleLoop)
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def stop(self, rusage=None):
+        """
+        Stop watching the process, the rusage is the one reported when the process has been reaped.
+        """
+        self.__endTime = time.time()
+        self.__rusage = rusage
+
+        self.__stopEvent.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def wallTime(self):
+        """
+        Return the time (in seconds) the process has been running.
+        """
+        if self.__startTime is None:
+            return 0.0
+
+        return (self.__endTime or time.time()) - self.__startTime
+
+    def userTime(self):
+        """
+        Return the user cpu time (in seconds) used by the process tree.
+        """
+        if self.__rusage is not None:
+            return self.__rusage.ru_utime
+
+        return sum(ticks[0] for ticks in self.__processCpuTicks.values()) / self.__clockTicks()
+
+    def systemTime(self):
+        """
+        Return the system cpu time (in seconds) used by the process tree.
+        """
+        if self.__rusage is not None:
+            return self.__rusage.ru_stime
+
+        return sum(ticks[1] for ticks in self.__processCpuTicks.values()) / self.__clockTicks()
+
+    def cpuTime(self):
+        """
+        Return the total cpu time (user and system, in seconds) used by the process tree.
+        """
+        return self.userTime() + self.systemTime()
+
+    def peakRss(self):
+        """
+        Return the peak resident memory (bytes) used by the process tree.
+
+        It's the highest sum of the tree found by the samples, processes that
+        finish before being sampled are not accounted.
+        """
+        return self.__peakTreeRss
+
+    def rusageMaxRss(self):
+        """
+        Return the max resident memory (bytes) reported by rusage when the process has been reaped (None when not available).
+
+        It's the peak of the largest process in the tree, which includes the
+        memory used by the launcher process that has been forked before it got
+        replaced by the executable. Therefore, it's not suitable to size small
+        processes ({@link peakRss}).
+        """
+        if self.__rusage is None:
+            return None
+
+        # linux reports the max rss in kilobytes
+        return self.__rusage.ru_maxrss * 1024
+
+    def readBytes(self):
+        """
+        Return the bytes read from the storage by the process tree.
+        """
+        return sum(io[0] for io in self.__processIo.values())
+
+    def writeBytes(self):
+        """
+        Return the bytes written to the storage by the process tree.
+        """
+        return sum(io[1] for io in self.__processIo.values())
+
+    def processCount(self):
+        """
+        Return the number of processes seen in the process tree.
+        """
+        return len(self.__processCpuTicks)
+
+    def sampleCount(self):
+        """
+        Return the number of samples taken from the process tree.
+        """
+        return self.__sampleCount
+
+    def summary(self):
+        """
+        Return a dict containing the collected values.
+        """
+        return {
+            'wallTime': self.wallTime(),
+            'userTime': self.userTime(),
+            'systemTime': self.systemTime(),
+            'cpuTime': self.cpuTime(),
+            'peakRss': self.peakRss(),
+            'rusageMaxRss': self.rusageMaxRss(),
+            'readBytes': self.readBytes(),
+            'writeBytes': self.writeBytes(),
+            'processCount': self.processCount(),
+            'sampleCount': self.sampleCount()
+        }
+
+    @staticmethod
+    def createDefault():
+        """
+        Return a process telemetry configured through the process environment.
+
+        ULAUNCHER_TELEMETRY: when "0" the telemetry is disabled (returns None).
+        ULAUNCHER_TELEMETRY_INTERVAL: sampling interval in seconds (default 1).
+        It's only available on platforms providing os.wait4.
+        """
+        if os.environ.get('ULAUNCHER_TELEMETRY') == '0' or not hasattr(os, 'wait4'):
+            return None
+
+        return ProcessTelemetry(
+            float(os.environ.get('ULAUNCHER_TELEMETRY_INTERVAL', 1.0))
+        )
+
+    def __sampleLoop(self):
+        """
+        Sample the process tree until the telemetry is stopped.
+        """
+        while True:
+            self.__sample()
+            if self.__stopEvent.wait(self.__interval):
+                break
+
+    def __sample(self):
+        """
+        Sample the usage of the process tree.
+        """
+        treeRss = 0
+        for pid in self.__processTree():
+            stat = self.__readStat(pid)
+            if stat is None:
+                continue
+
+            cpuTicks, rss = stat
+            self.__processCpuTicks[pid] = cpuTicks
+            treeRss += rss
+
+            io = self.__readIo(pid)
+            if io is not None:
+                self.__processIo[pid] = io
+
+        self.__peakTreeRss = max(self.__peakTreeRss, treeRss)
+        self.__sampleCount += 1
+
+    def __processTree(self):
+        """
+        Return a list containing the ids of the process and its descendants.
+        """
+        result = []
+        pending = [self.__pid]
+        while pending:
+            pid = pending.pop()
+            result.append(pid)
+            pending.extend(self.__childPids(pid))
+
+        return result
+
+    def __childPids(self, pid):
+        """
+        Return a list of ids for the children of the process.
+        """
+        result = []
+        taskDir = os.path.join(self.__procDir, str(pid), 'task')
+        try:
+            for tid in os.listdir(taskDir):
+                with open(os.path.join(taskDir, tid, 'children')) as f:
+                    result.extend(int(childPid) for childPid in f.read().split())
+        except (IOError, OSError):
+            pass
+
+        return result
+
+    def __readStat(self, pid):
+        """
+        Return a tuple containing the cpu ticks (user, system) and the rss (bytes) for the process.
+        """
+        try:
+            with open(os.path.join(self.__procDir, str(pid), 'stat')) as f:
+                contents = f.read()
+        except (IOError, OSError):
+            return None
+
+        # the command name can contain spaces, the fields
+        # are taken from the closing paren
+        fields = contents[contents.rfind(')') + 2:].split()
+
+        return (
+            (int(fields[11]), int(fields[12])),
+            int(fields[21]) * self.__pageSize()
+        )
+
+    def __readIo(self, pid):
+        """
+        Return a tuple containing the bytes read and written by the process (None when not available).
+        """
+        values = {}
+        try:
+            with open(os.path.join(self.__procDir, str(pid), 'io')) as f:
+                for line in f:
+                    name, value = line.split(':')
+                    values[name] = int(value)
+        except (IOError, OSError, ValueError):
+            return None
+
+        return (values.get('read_bytes', 0), values.get('write_bytes', 0))
+
+    @staticmethod
+    def __clockTicks():
+        """
+        Return the number of clock ticks per second.
+        """
+        return float(os.sysconf('SC_CLK_TCK'))
+
+    @staticmethod
+    def __pageSize():
+        """
+        Return the size of a memory page in bytes.
+        """
+        return os.sysconf('SC_PAGE_SIZE')
@@ -0,0 +1,91 @@
+import re
+from .ResourceResolver import ResourceResolver
+
+class ResolverFunctions(object):
+    """
+    Native implementations for the helper commands shipped under bin.
+
+    They are registered to the resource resolver, so values like
+    "$(majorver $MAYA_VERSION)" don't need to spawn a shell. The
+    output must match the one from the commands byte for byte.
+    """
+
+    # regex: major version (same expression used by majorver)
+    __majorVersionRegex = re.compile('[0-9]*')
+
+    # regex: major and minor version (same expression used by majorminorver)
+    __majorMinorVersionRegex = re.compile('[0-9]*.[0-9]*')
+
+    # regex: arguments interpreted as options by bash's echo
+    __echoOptionRegex = re.compile('^-[neE]+$')
+
+    # regex: valid variable name
+    __varNameRegex = re.compile('^[A-Za-z_][A-Za-z0-9_]*$')
+
+    @staticmethod
+    def majorver(args, env):
+        """
+        Return the major version based on a semver (example: 1.3.0 -> 1).
+        """
+        return ResolverFunctions.__firstMatch(
+            ResolverFunctions.__majorVersionRegex,
+            args[0] if args else ''
+        )
+
+    @staticmethod
+    def majorminorver(args, env):
+        """
+        Return the major and minor version based on a semver (example: 1.3.0 -> 1.3).
+        """
+        return ResolverFunctions.__firstMatch(
+            ResolverFunctions.__majorMinorVersionRegex,
+            args[0] if args else ''
+        )
+
+    @staticmethod
+    def autodesklicloc(args, env):
+        """
+        Return the location about the autodesk license (example: maya 2018.0.1).
+        """
+        appName = args[0] if args else ''
+        appVersion = args[1] if len(args) > 1 else ''
+        appMajorVersion = ResolverFunctions.majorver([appVersion], env).rstrip('\n')
+
+        appLicenseEnvName = '{0}{1}_AUTODESK_ADLM_THINCLIENT_ENV'.format(
+            appName.upper(),
+            appMajorVersion
+        )
+
+        # bash fails on invalid names, letting the command report it
+        if not ResolverFunctions.__varNameRegex.match(appLicenseEnvName):
+            return None
+
+        return ResolverFunctions.__echo(env.get(appLicenseEnvName, ''))
+
+    @staticmethod
+    def __firstMatch(regex, value):
+        """
+        Return the output of "echo value | grep -oE regex | head -n 1".
+        """
+        for line in ResolverFunctions.__echo(value).splitlines():
+            for match in regex.finditer(line):
+                if match.group(0):
+                    return '{0}\n'.format(match.group(0))
+
+        return ''
+
+    @staticmethod
+    def __echo(value):
+        """
+        Return the output of bash's echo for a single quoted argument.
+        """
+        if ResolverFunctions.__echoOptionRegex.match(value):
+            return '' if 'n' in value else '\n'
+
+        return '{0}\n'.format(value)
+
+
+# registering functions
+ResourceResolver.registerFunction(ResolverFunctions.majorver, 'majorver')
+ResourceResolver.registerFunction(ResolverFunctions.majorminorver, 'majorminorver')
+ResourceResolver.registerFunction(ResolverFunctions.autodesklicloc, 'autodesklicloc')
@@ -1,4 +1,20 @@
+import os
+import re
+import sys
+import uuid
+import signal
+import threading
 import subprocess
+from collections import OrderedDict
+from .Cache import CommandCache
+from .Timings import Timings
+from .ShellCoprocess import ShellCoprocess, ShellCoprocessError
+
+# concurrent.futures is only available for python 2 through the "futures" backport
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
 
 class ResolveError(Exception):
     """Resolve error."""
@@ -8,10 +24,122 @@ class ResourceResolver(object):
     Resolves a value that contains containg bash functions and environment variables.
     """
 
-    def __init__(self, env={}):
+    # regex: environment variable references that can be expanded natively:
+    # "$VAR", "${VAR}" and "${VAR:-default}"
+    __envReferenceRegex = re.compile(
+        r'\$(?:([A-Za-z_][A-Za-z0-9_]*)|\{([A-Za-z_][A-Za-z0-9_]*)(:-[^{}]*)?\})'
+    )
+
+    # regex: literal characters that have no special meaning for the shell.
+    __nativeLiteralRegex = re.compile(r'^[A-Za-z0-9_./:,=+%@ \t-]*$')
+
+    # regex: characters that would trigger pathname expansion or escape
+    # sequences (echo) when coming from an unquoted expansion.
+    __nativeUnsafeExpansionRegex = re.compile(r'[*?\[\\]')
+
+    # regex: field separators used by the shell (default IFS).
+    __fieldSeparatorRegex = re.compile('[ \t\n]+')
+
+    # variables that are set by the shell (dash or bash) even when they
+    # are part of the env, therefore they can't be resolved from the env.
+    # The variables that are not part of the env are always left to the
+    # shell, since each shell defines a different set of variables.
+    __shellVarNames = frozenset([
+        '_',
+        'PWD',
+        'OLDPWD',
+        'PPID',
+        'IFS',
+        'OPTIND',
+        'OPTERR',
+        'PS1',
+        'PS2',
+        'PS4',
+        'LINENO',
+        'RANDOM',
+        'SRANDOM',
+        'SECONDS',
+        'EPOCHSECONDS',
+        'EPOCHREALTIME',
+        'SHLVL',
+        'UID',
+        'EUID',
+        'GROUPS',
+        'HISTCMD',
+        'FUNCNAME',
+        'PIPESTATUS',
+        'SHELLOPTS',
+        'BASH',
+        'BASHOPTS',
+        'BASHPID',
+        'BASH_ARGC',
+        'BASH_ARGV',
+        'BASH_COMMAND',
+        'BASH_LINENO',
+        'BASH_SOURCE',
+        'BASH_SUBSHELL',
+        'BASH_VERSINFO',
+        'BASH_VERSION'
+    ])
+
+    # characters that prevent a value from having its commands "$(command)"
+    # processed individually.
+    __commandUnsafeChars = '\'\\`#()'
+
+    # prefix used by the variables holding the output of the commands
+    __commandVarPrefix = '__ULAUNCHER_COMMAND_'
+
+    # process wide cache used to memoize the output of the commands
+    __commandCache = None
+    __commandCacheCreated = False
+
+    # regex: command calling a function "name args"
+    __functionCallRegex = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_.-]*)(?:\s+(.*?))?\s*$', re.DOTALL)
+
+    # python functions that replace commands, they are evaluated in-process
+    __registeredFunctions = {}
+
+    # modes used to run the commands that are not cached:
+    # batch: all commands run through a single shell session (one after another).
+    # concurrent: each command runs in its own shell session dispatched by a
+    # bounded thread pool, useful when commands are slow (license servers, nfs...).
+    # coprocess: commands run through a long-lived shell shared by the resolvers
+    # using the same env, avoiding to spawn a shell per resolution.
+    __modes = (
+        'batch',
+        'concurrent',
+        'coprocess'
+    )
+
+    def __init__(self, env={}, mode=None, maxWorkers=None, commandTimeout=None):
         """
         Create a value resolver object.
+
+        When not provided, the mode, max workers and command timeout (in seconds)
+        are read from the process environment: ULAUNCHER_RESOLVER_MODE (default
+        "batch"), ULAUNCHER_RESOLVER_MAX_WORKERS (default 8) and
+        ULAUNCHER_RESOLVER_COMMAND_TIMEOUT (default no timeout). The workers
+        are only used by the concurrent mode and the timeout by the concurrent
+        and coprocess modes.
         """
+        if mode is None:
+            mode = os.environ.get('ULAUNCHER_RESOLVER_MODE', 'batch')
+
+        if maxWorkers is None:
+            maxWorkers = int(os.environ.get('ULAUNCHER_RESOLVER_MAX_WORKERS', 8))
+
+        if commandTimeout is None and os.environ.get('ULAUNCHER_RESOLVER_COMMAND_TIMEOUT'):
+            commandTimeout = float(os.environ['ULAUNCHER_RESOLVER_COMMAND_TIMEOUT'])
+
+        assert mode in self.__modes, \
+            'Invalid resolver mode "{0}"'.format(mode)
+
+        assert mode != 'concurrent' or ThreadPoolExecutor is not None, \
+            'Concurrent resolver mode requires concurrent.futures!'
+
+        self.__mode = mode
+        self.__maxWorkers = max(1, maxWorkers)
+        self.__commandTimeout = commandTimeout
         self.__setEnv(env)
 
     def env(self):
@@ -20,38 +148,531 @@ class ResourceResolver(object):
         """
         return self.__env
 
+    def mode(self):
+        """
+        Return the mode used to run the commands.
+        """
+        return self.__mode
+
+    def maxWorkers(self):
+        """
+        Return the maximum number of commands running at the same time (concurrent mode).
+        """
+        return self.__maxWorkers
+
+    def commandTimeout(self):
+        """
+        Return the maximum time in seconds a command can take (concurrent and coprocess modes).
+        """
+        return self.__commandTimeout
+
     def resolve(self, value):
         """
         Return a processed value.
 
         By resolving value of environments "$VAR" and commands "$(command)".
         """
-        # in case there is nothing to be resolved
-        if '$' not in value:
-            return value
+        return self.resolveMany([value])[0]
+
+    def resolveMany(self, values):
+        """
+        Return a list containing the processed values (in the same order).
+
+        The commands "$(command)" are evaluated individually so their outputs
+        can be memoized by the command cache (when enabled). The commands and
+        the values that require a shell are all processed by a single shell
+        session rather than one session per value (in the concurrent mode the
+        commands run in their own sessions).
+        """
+        with Timings.phase('resolve', values=values) as phase:
+            result = self.__resolveMany(values)
+            phase.setArg('results', result)
+
+        return result
+
+    def __resolveMany(self, values):
+        """
+        Return a list containing the processed values (see {@link resolveMany}).
+        """
+        result = list(values)
+        shellValues, commands, commandValues = self.__parseValues(values, result)
+
+        # the output of the commands are exposed as variables
+        env = self.env()
+        pendingCommands = []
+        if commands:
+            env = dict(env)
+            pendingCommands = self.__runCommands(commands, env)
+
+        if pendingCommands:
+            # the values using the commands go through the same shell
+            # session that runs the commands
+            for commandValue, indices in commandValues.items():
+                shellValues.setdefault(commandValue, []).extend(indices)
+        else:
+            self.__expandCommandValues(commandValues, env, result, shellValues)
+
+        if shellValues or pendingCommands:
+            self.__expandShellValues(shellValues, pendingCommands, commands, env, result)
+
+        return result
+
+    def __parseValues(self, values, result):
+        """
+        Parse the values, the ones that can be expanded natively are set to the result.
+
+        Returns a tuple containing: the values that need to go through the
+        shell mapped to their indices, the unique commands found in the values
+        mapped to the variables holding their outputs and the values where the
+        commands have been replaced by the variables mapped to their indices.
+        """
+        shellValues = OrderedDict()
+        commands = OrderedDict()
+        commandValues = OrderedDict()
+
+        for index, value in enumerate(values):
+
+            # in case there is nothing to be resolved
+            if '$' not in value:
+                continue
+
+            # values only referencing environment variables are expanded
+            # in-process, avoiding to spawn a shell for them
+            output = self.__expandNative(value, self.env())
+            if output is not None:
+                result[index] = output
+                continue
+
+            parsedValue = self.__parseCommands(value)
+            if parsedValue is None:
+                shellValues.setdefault(value, []).append(index)
+                continue
+
+            literals, valueCommands = parsedValue
+            commandValue = literals[0]
+            for command, literal in zip(valueCommands, literals[1:]):
+                if command not in commands:
+                    commands[command] = '{0}{1}'.format(self.__commandVarPrefix, len(commands))
+                commandValue += '${{{0}}}{1}'.format(commands[command], literal)
+
+            commandValues.setdefault(commandValue, []).append(index)
+
+        return (shellValues, commands, commandValues)
+
+    def __expandCommandValues(self, commandValues, env, result, shellValues):
+        """
+        Expand the values using the outputs of the commands (available in the env).
+
+        The values that can't be expanded natively are added to the shell values.
+        """
+        for commandValue, indices in commandValues.items():
+            output = self.__expandNative(commandValue, env)
+            if output is None:
+                shellValues.setdefault(commandValue, []).extend(indices)
+            else:
+                for index in indices:
+                    result[index] = output
+
+    def __expandShellValues(self, shellValues, pendingCommands, commands, env, result):
+        """
+        Run the pending commands and expand the shell values through a single shell session.
+
+        The output of each command is assigned to its variable, so the values
+        running after it can use it.
+        """
+        lines = [
+            '{0}="$({1})"\nprintf "%s" "${0}"'.format(commands[command], command)
+            for command in pendingCommands
+        ]
+        lines.extend('echo {0}'.format(value) for value in shellValues.keys())
+
+        outputs = self.__runShell(lines, env)
+
+        self.__cacheCommandOutputs(pendingCommands, outputs[:len(pendingCommands)])
+
+        for value, output in zip(shellValues.keys(), outputs[len(pendingCommands):]):
+
+            # cleaning result, removing "\n" from the end of the result
+            if output.endswith("\n"):
+                output = output[:-1]
+
+            for index in shellValues[value]:
+                result[index] = output
+
+    @staticmethod
+    def commandCache():
+        """
+        Return the cache used to memoize the output of the commands (None when disabled).
+
+        By default it's created through {@link CommandCache.createDefault}.
+        """
+        if not ResourceResolver.__commandCacheCreated:
+            ResourceResolver.setCommandCache(CommandCache.createDefault())
+
+        return ResourceResolver.__commandCache
+
+    @staticmethod
+    def setCommandCache(commandCache):
+        """
+        Set the cache used to memoize the output of the commands (None disables it).
+        """
+        assert commandCache is None or isinstance(commandCache, CommandCache), \
+            "Invalid CommandCache type!"
+
+        ResourceResolver.__commandCache = commandCache
+        ResourceResolver.__commandCacheCreated = True
+
+    @staticmethod
+    def registerFunction(function, name):
+        """
+        Register a python function that is evaluated in-process in place of the command name.
+
+        The function is called with the list of arguments (already expanded)
+        and the env, it must return the same output the command would write
+        to the stdout, or None to let the command run through the shell.
+        Commands that involve anything other than plain arguments (pipes,
+        quotes, etc) always run through the shell.
+        """
+        assert callable(function), "Invalid function!"
+
+        ResourceResolver.__registeredFunctions[name] = function
+
+    @staticmethod
+    def registeredFunctionNames():
+        """
+        Return a list of registered function names.
+        """
+        return ResourceResolver.__registeredFunctions.keys()
+
+    def __expandNative(self, value, env):
+        """
+        Return the value expanded without a shell.
+
+        The result is the same as the one produced by "echo <value>" in
+        the shell. None is returned when the value uses anything other than
+        plain references to variables from the env (commands, quotes, globs,
+        variables defined by the shell, etc), meaning it needs to be processed
+        by the shell.
+        """
+        expanded = self.__expandReferences(value, env)
+        if expanded is None:
+            return None
+
+        # mimicking the field splitting done by the shell, where echo
+        # joins the resulting fields with a single space
+        fields = [field for field in self.__fieldSeparatorRegex.split(expanded) if field]
+
+        # echo would interpret it as an option
+        if fields and fields[0].startswith('-'):
+            return None
+
+        output = ' '.join(fields)
+
+        # the shell output is decoded as ascii
+        try:
+            output.encode('ascii')
+        except UnicodeError:
+            return None
+
+        return output
+
+    def __expandReferences(self, value, env):
+        """
+        Return the value with the variable references replaced by their values.
+
+        Return None when the value can't be expanded natively.
+        """
+        result = []
+        position = 0
+        for match in self.__envReferenceRegex.finditer(value):
+            literal = value[position:match.start()]
+            if not self.__nativeLiteralRegex.match(literal):
+                return None
+            result.append(literal)
+
+            varName = match.group(1) or match.group(2)
+            if varName in self.__shellVarNames or varName not in env:
+                return None
+
+            varValue = env[varName]
+
+            # ${VAR:-default}
+            if not varValue and match.group(3) is not None:
+                varValue = self.__expandReferences(match.group(3)[2:], env)
+                if varValue is None:
+                    return None
+
+            elif self.__nativeUnsafeExpansionRegex.search(varValue):
+                return None
+
+            result.append(varValue)
+            position = match.end()
+
+        literal = value[position:]
+        if not self.__nativeLiteralRegex.match(literal):
+            return None
+        result.append(literal)
+
+        return ''.join(result)
+
+    def __parseCommands(self, value):
+        """
+        Return the commands "$(command)" found in the value.
+
+        The result is a tuple containing the literals surrounding the commands and
+        the commands themselves, where there is always one more literal than
+        commands. None is returned when the commands can't be safely processed
+        individually (quotes, escapes, backticks, arithmetic expansion, etc).
+        """
+        literals = []
+        commands = []
+        position = 0
+        index = value.find('$(')
+        while index != -1:
+            if value.startswith('$((', index):
+                return None
+
+            # looking for the matching parenthesis
+            depth = 1
+            end = index + 2
+            while end < len(value) and depth:
+                if value[end] == '(':
+                    depth += 1
+                elif value[end] == ')':
+                    depth -= 1
+                end += 1
+
+            command = value[index + 2:end - 1]
+            if depth or any(char in command for char in '\'\\`"'):
+                return None
+
+            literals.append(value[position:index])
+            commands.append(command)
+            position = end
+            index = value.find('$(', position)
+
+        literals.append(value[position:])
+
+        for literal in literals:
+            if any(char in literal for char in self.__commandUnsafeChars):
+                return None
+
+        return (literals, commands)
+
+    def __runCommands(self, commands, env):
+        """
+        Assign the output of the commands to their variables in the env.
+
+        Registered functions are evaluated in-process, otherwise the outputs
+        are looked up from the command cache. In the concurrent mode the
+        remaining commands run right away, otherwise they are returned (as
+        a list) so they can run with the shell values.
+        """
+        commandCache = self.commandCache()
+        pendingCommands = []
+
+        for command, varName in commands.items():
+            output = self.__runFunction(command)
+            if output is None and commandCache is not None and commandCache.isCacheable(command):
+                output = commandCache.get(commandCache.commandKey(command, self.env()))
+
+            if output is None:
+                pendingCommands.append(command)
+            else:
+                env[varName] = output
+
+        if pendingCommands and self.mode() == 'concurrent':
+            outputs = self.__runCommandsConcurrently(pendingCommands)
+            self.__cacheCommandOutputs(pendingCommands, outputs)
+
+            for command, output in zip(pendingCommands, outputs):
+                env[commands[command]] = output
+            pendingCommands = []
+
+        return pendingCommands
+
+    def __cacheCommandOutputs(self, commands, outputs):
+        """
+        Store the output of the commands in the command cache (when enabled).
+        """
+        commandCache = self.commandCache()
+        if commandCache is None or not commands:
+            return
+
+        for command, output in zip(commands, outputs):
+            if commandCache.isCacheable(command):
+                commandCache.set(commandCache.commandKey(command, self.env()), output)
+
+        commandCache.save()
+
+    def __runFunction(self, command):
+        """
+        Return the output of the registered function called by the command.
+
+        None is returned when the command can't be evaluated by a function.
+        """
+        if not self.__registeredFunctions:
+            return None
+
+        match = self.__functionCallRegex.match(command)
+        if not match or match.group(1) not in self.__registeredFunctions:
+            return None
+
+        args = self.__expandReferences(match.group(2) or '', self.env())
+        if args is None:
+            return None
+
+        output = self.__registeredFunctions[match.group(1)](
+            [arg for arg in self.__fieldSeparatorRegex.split(args) if arg],
+            self.env()
+        )
+
+        if output is None:
+            return None
+
+        # same as the command substitution, removing the trailing new lines
+        return output.rstrip('\n')
+
+    def __runCommandsConcurrently(self, commands):
+        """
+        Return a list containing the output of the commands.
+
+        Each command runs in its own shell session through a thread pool,
+        the results are returned in the same order as the commands.
+        """
+        if len(commands) == 1:
+            return [self.__runCommand(commands[0])]
+
+        pool = ThreadPoolExecutor(max_workers=min(self.maxWorkers(), len(commands)))
+        try:
+            return list(pool.map(self.__runCommand, commands))
+        finally:
+            pool.shutdown(wait=True)
+
+    def __runCommand(self, command):
+        """
+        Return the output of the command running in its own shell session.
+        """
+        # compatibility with python 2/3 (start_new_session is python 3 only,
+        # preexec_fn is not safe to use from threads under python 3)
+        sessionArgs = {'start_new_session': True}
+        if sys.version_info[0] < 3:
+            sessionArgs = {'preexec_fn': os.setsid}
 
-        # otherwise process the value. Using shell to be able to process
-        # any commands $(command) that can be part of the unresolved value
         process = subprocess.Popen(
-            'echo {0}'.format(value),
+            command,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             env=self.env(),
-            shell=True
+            shell=True,
+            **sessionArgs
+        )
+
+        # communicate(timeout=...) is python 3 only, the timeout
+        # is handled by a timer instead
+        timedOut = threading.Event()
+        timer = None
+        if self.commandTimeout() is not None:
+            timer = threading.Timer(self.commandTimeout(), self.__killSession, (process, timedOut))
+            timer.start()
+
+        try:
+            output, error = process.communicate()
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+        if timedOut.is_set():
+            raise ResolveError(
+                'Command timed out after {0} seconds: {1}'.format(self.commandTimeout(), command)
+            )
+
+        # in case of any erros
+        if error:
+            raise ResolveError(error)
+
+        # same as the command substitution, removing the trailing new lines
+        return output.decode('ascii').rstrip('\n')
+
+    @staticmethod
+    def __killSession(process, timedOut):
+        """
+        Kill the session of the process (used when a command times out).
+
+        The whole session is killed, so any process spawned by the command
+        does not keep the pipes open.
+        """
+        timedOut.set()
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            # the process is already gone
+            pass
+
+    def __runShell(self, lines, env):
+        """
+        Return a list containing the output for each line executed by a single shell session.
+
+        Each line is followed by a marker line which is used to split
+        the output back to the lines.
+        """
+        marker = '__ULAUNCHER_RESOLVE_{0}__'.format(uuid.uuid4().hex)
+        script = ''.join(
+            '{0}\nprintf "\\n%s\\n" {1}\n'.format(line, marker) for line in lines
         )
 
-        output, error = process.communicate()
+        if self.mode() == 'coprocess':
+            output, error = self.__runCoprocess(script, env)
+        else:
+            # using shell to be able to process any commands $(command)
+            # that can be part of the unresolved value
+            process = subprocess.Popen(
+                script,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+                shell=True
+            )
+
+            output, error = process.communicate()
+
         output = output.decode('ascii')
 
         # in case of any erros
         if error:
             raise ResolveError(error)
 
-        # cleaning result, removing "\n" from the end of the result
-        if output.endswith("\n"):
-            output = output[:-1]
+        outputs = output.split('\n{0}\n'.format(marker))
+        if len(outputs) != len(lines) + 1:
+            raise ResolveError(
+                'Could not resolve: {0}'.format(', '.join(lines))
+            )
 
-        return output
+        return outputs[:-1]
+
+    def __runCoprocess(self, script, env):
+        """
+        Return a tuple with the stdout and stderr of the script executed by the shell coprocess.
+
+        Variables that are not part of the resolver env (command outputs) are
+        assigned at the top of the script.
+        """
+        assignments = []
+        for varName, varValue in env.items():
+            if self.env().get(varName) != varValue:
+                assignments.append(
+                    "{0}='{1}'\n".format(varName, varValue.replace("'", "'\\''"))
+                )
+
+        script = ''.join(assignments) + script
+
+        try:
+            return ShellCoprocess.instance(self.env()).execute(
+                script,
+                self.commandTimeout()
+            )
+        except ShellCoprocessError as err:
+            raise ResolveError(str(err))
 
     def __setEnv(self, env):
         """
@@ -0,0 +1,196 @@
+import os
+import time
+import uuid
+import atexit
+import select
+import hashlib
+import threading
+import subprocess
+
+class ShellCoprocessError(Exception):
+    """Shell coprocess error."""
+
+class ShellCoprocess(object):
+    """
+    Long-lived shell process that evaluates scripts sent through its stdin.
+
+    It avoids the cost of spawning a shell for every evaluation, which
+    becomes a round trip over the pipes instead. It uses the same shell
+    as the other resolver modes (/bin/sh), so the values are resolved the
+    same way regardless of the mode.
+    """
+
+    __shellArgs = ['/bin/sh']
+
+    # maximum number of bytes written to the shell at once (writes up to
+    # this size never block once the pipe is reported as writable)
+    __writeSize = getattr(select, 'PIPE_BUF', 512)
+
+    __instances = {}
+    __instancesLock = threading.Lock()
+
+    def __init__(self, env={}):
+        """
+        Create a shell coprocess object (the shell is started on demand).
+        """
+        self.__process = None
+        self.__lock = threading.Lock()
+        self.__setEnv(env)
+
+    def env(self):
+        """
+        Return the environment used by the shell.
+        """
+        return self.__env
+
+    def isRunning(self):
+        """
+        Return a boolean telling if the shell process is alive.
+        """
+        return self.__process is not None and self.__process.poll() is None
+
+    def execute(self, script, timeout=None):
+        """
+        Execute the script and return a tuple containing its stdout and stderr (bytes).
+
+        The script runs in a subshell of the coprocess, so the state it
+        changes (variables, current dir, options...) never affects the next
+        evaluations. In case the shell has died it gets restarted and the
+        script is sent again (only once).
+        """
+        marker = '__ULAUNCHER_COPROCESS_{0}__'.format(uuid.uuid4().hex)
+        payload = '(\n{0}\n) </dev/null\nprintf "\\n%s\\n" {1}\nprintf "%s\\n" {1} >&2\n'.format(
+            script,
+            marker
+        ).encode('utf_8')
+
+        with self.__lock:
+            for attempt in range(2):
+                if not self.isRunning():
+                    self.__start()
+
+                try:
+                    return self.__exchange(payload, marker.encode('utf_8'), timeout)
+
+                except (IOError, OSError, EOFError) as err:
+                    self.close()
+                    if attempt:
+                        raise ShellCoprocessError(
+                            'Shell coprocess died: {0}'.format(err)
+                        )
+
+    def close(self):
+        """
+        Terminate the shell process.
+        """
+        if self.__process is None:
+            return
+
+        process = self.__process
+        self.__process = None
+
+        if process.poll() is None:
+            process.kill()
+
+        process.wait()
+        for stream in (process.stdin, process.stdout, process.stderr):
+            stream.close()
+
+    @staticmethod
+    def instance(env):
+        """
+        Return the shared shell coprocess for the env (one per env).
+        """
+        key = hashlib.sha1(
+            '\0'.join(sorted('{0}={1}'.format(*item) for item in env.items())).encode('utf_8')
+        ).hexdigest()
+
+        with ShellCoprocess.__instancesLock:
+            if key not in ShellCoprocess.__instances:
+                ShellCoprocess.__instances[key] = ShellCoprocess(env)
+
+            return ShellCoprocess.__instances[key]
+
+    @staticmethod
+    def closeAll():
+        """
+        Terminate all shared shell coprocesses.
+        """
+        with ShellCoprocess.__instancesLock:
+            for instance in ShellCoprocess.__instances.values():
+                instance.close()
+            ShellCoprocess.__instances.clear()
+
+    def __start(self):
+        """
+        Start the shell process.
+        """
+        self.__process = subprocess.Popen(
+            self.__shellArgs,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self.env()
+        )
+
+    def __exchange(self, payload, marker, timeout):
+        """
+        Write the payload and return a tuple with the stdout and stderr read until the marker shows up in both streams.
+
+        The payload is written while the output is read, so the shell never
+        gets blocked writing its output while the payload is being written.
+        """
+        stdinFd = self.__process.stdin.fileno()
+        payload = memoryview(payload)
+        writers = [stdinFd]
+        stdoutMarker = b'\n' + marker + b'\n'
+        stderrMarker = marker + b'\n'
+        stdoutFd = self.__process.stdout.fileno()
+        stderrFd = self.__process.stderr.fileno()
+        buffers = {
+            stdoutFd: b'',
+            stderrFd: b''
+        }
+        pending = [stdoutFd, stderrFd]
+        deadline = None if timeout is None else time.time() + timeout
+
+        while pending:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.close()
+                    raise ShellCoprocessError(
+                        'Shell coprocess timed out after {0} seconds'.format(timeout)
+                    )
+
+            readyReaders, readyWriters = select.select(pending, writers, [], remaining)[:2]
+            if readyWriters:
+                written = os.write(stdinFd, payload[:self.__writeSize])
+                payload = payload[written:]
+                if not len(payload):
+                    writers = []
+
+            for fd in readyReaders:
+                data = os.read(fd, 65536)
+                if not data:
+                    raise EOFError('unexpected end of stream')
+
+                buffers[fd] += data
+                if buffers[fd].endswith(stdoutMarker if fd == stdoutFd else stderrMarker):
+                    pending.remove(fd)
+
+        return (
+            buffers[stdoutFd][:-len(stdoutMarker)],
+            buffers[stderrFd][:-len(stderrMarker)]
+        )
+
+    def __setEnv(self, env):
+        """
+        Set the environment used by the shell.
+        """
+        self.__env = dict(env)
+
+
+# making sure the shells don't outlive the process
+atexit.register(ShellCoprocess.closeAll)
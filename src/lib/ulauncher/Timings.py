@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from .TimingsPhase import TimingsPhase
+
+class InvalidTimingsFormatError(Exception):
+    """Invalid timings format error."""
+
+class Timings(object):
+    """
+    Records how long each phase of a launch takes.
+
+    The phases are measured through {@link phase} and instant events (for
+    instance the first output of the process) through {@link mark}. Both
+    are static and go to the process wide timings ({@link current}), when
+    the timings are disabled they do nothing.
+
+    The timings are written either as json or as a chrome trace (it can be
+    opened by chrome://tracing or https://ui.perfetto.dev).
+    """
+
+    formatNames = ('json', 'chrome')
+
+    # process wide timings
+    __current = None
+    __currentCreated = False
+
+    # phase used while the timings are disabled
+    __disabledPhase = TimingsPhase(None, None)
+
+    def __init__(self, filePath=None, outputFormat='json'):
+        """
+        Create a timings object.
+
+        The timings are written to the file path by {@link write} (by default
+        to the stderr).
+        """
+        if outputFormat not in self.formatNames:
+            raise InvalidTimingsFormatError(
+                'Invalid timings format "{0}"'.format(outputFormat)
+            )
+
+        self.__filePath = filePath
+        self.__outputFormat = outputFormat
+        self.__startTime = time.time()
+        self.__events = []
+        self.__written = False
+        self.__lock = threading.Lock()
+
+    def filePath(self):
+        """
+        Return the path where the timings are written (None means the stderr).
+        """
+        return self.__filePath
+
+    def outputFormat(self):
+        """
+        Return the format used to write the timings.
+        """
+        return self.__outputFormat
+
+    def startTime(self):
+        """
+        Return the time when the timings have been created (used as origin for the events).
+        """
+        return self.__startTime
+
+    def addEvent(self, name, startTime, duration=None, args=None, threadId=None):
+        """
+        Add an event, the duration (in seconds) is None for instant events.
+        """
+        with self.__lock:
+            self.__events.append(
+                {
+                    'name': name,
+                    'start': startTime - self.__startTime,
+                    'duration': duration,
+                    'args': dict(args) if args else {},
+                    'thread': threadId
+                }
+            )
+
+    def events(self):
+        """
+        Return a list of the events sorted by their start time.
+
+        Each event is a dict containing: "name", "start" (seconds since
+        {@link startTime}), "duration" (seconds, None for instant events),
+        "args" and "thread".
+        """
+        with self.__lock:
+            return sorted(self.__events, key=lambda event: event['start'])
+
+    def summary(self):
+        """
+        Return a dict containing the total duration (seconds) and count for each phase name.
+        """
+        result = {}
+        for event in self.events():
+            if event['duration'] is None:
+                continue
+
+            total = result.setdefault(event['name'], {'duration': 0.0, 'count': 0})
+            total['duration'] += event['duration']
+            total['count'] += 1
+
+        return result
+
+    def toJson(self):
+        """
+        Return a dict containing the events and the summary.
+        """
+        return {
+            'startTime': self.startTime(),
+            'pid': os.getpid(),
+            'events': self.events(),
+            'summary': self.summary()
+        }
+
+    def toChromeTrace(self):
+        """
+        Return a dict describing the events in the chrome trace event format.
+        """
+        pid = os.getpid()
+        traceEvents = []
+        for event in self.events():
+            traceEvent = {
+                'name': event['name'],
+                'cat': event['name'].split('.')[0],
+                'ts': int(event['start'] * 1000000),
+                'pid': pid,
+                'tid': event['thread'] or 0,
+                'args': self.__jsonArgs(event['args'])
+            }
+
+            if event['duration'] is None:
+                traceEvent['ph'] = 'i'
+                traceEvent['s'] = 'p'
+            else:
+                traceEvent['ph'] = 'X'
+                traceEvent['dur'] = int(event['duration'] * 1000000)
+
+            traceEvents.append(traceEvent)
+
+        return {
+            'traceEvents': traceEvents,
+            'displayTimeUnit': 'ms'
+        }
+
+    def write(self):
+        """
+        Write the timings (only once, further calls are ignored).
+        """
+        with self.__lock:
+            if self.__written:
+                return
+            self.__written = True
+
+        if self.outputFormat() == 'chrome':
+            contents = self.toChromeTrace()
+        else:
+            contents = self.toJson()
+            for event in contents['events']:
+                event['args'] = self.__jsonArgs(event['args'])
+
+        if self.filePath() is None:
+            json.dump(contents, sys.stderr, indent=2)
+            sys.stderr.write('\n')
+            sys.stderr.flush()
+        else:
+            with open(self.filePath(), 'w') as f:
+                json.dump(contents, f, indent=2)
+
+    @staticmethod
+    def phase(name, **args):
+        """
+        Return a context manager measuring a phase under the current timings.
+
+        The phase can be described by the args, further args can be set
+        while measuring it ({@link TimingsPhase.setArg}).
+        """
+        timings = Timings.current()
+        if timings is None:
+            return Timings.__disabledPhase
+
+        return TimingsPhase(timings, name, args)
+
+    @staticmethod
+    def mark(name, **args):
+        """
+        Add an instant event to the current timings.
+        """
+        timings = Timings.current()
+        if timings is not None:
+            timings.addEvent(name, time.time(), None, args, threading.current_thread().ident)
+
+    @staticmethod
+    def current():
+        """
+        Return the process wide timings (None when disabled).
+
+        By default it's created through {@link createDefault}.
+        """
+        if not Timings.__currentCreated:
+            Timings.setCurrent(Timings.createDefault())
+
+        return Timings.__current
+
+    @staticmethod
+    def setCurrent(timings):
+        """
+        Set the process wide timings (None disables them).
+        """
+        assert timings is None or isinstance(timings, Timings), \
+            "Invalid Timings type!"
+
+        Timings.__current = timings
+        Timings.__currentCreated = True
+
+    @staticmethod
+    def createDefault():
+        """
+        Return a timings object configured through the process environment.
+
+        ULAUNCHER_TIMINGS: "1" writes the timings to the stderr, any other
+        value is used as the file path (disabled when not defined).
+        ULAUNCHER_TIMINGS_FORMAT: "json" (default) or "chrome".
+        The timings are written when the process exits.
+        """
+        value = os.environ.get('ULAUNCHER_TIMINGS')
+        if not value or value == '0':
+            return None
+
+        timings = Timings(
+            None if value == '1' else value,
+            os.environ.get('ULAUNCHER_TIMINGS_FORMAT', 'json')
+        )
+        atexit.register(timings.write)
+
+        return timings
+
+    @staticmethod
+    def __jsonArgs(args):
+        """
+        Return the args converted to values supported by json.
+        """
+        result = {}
+        for name, value in args.items():
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                value = repr(value)
+            result[name] = value
+
+        return result
@@ -0,0 +1,63 @@
+import time
+import threading
+
+class TimingsPhase(object):
+    """
+    Context manager measuring a phase for {@link Timings}.
+
+    When created without timings (timings disabled) it does nothing, so the
+    instrumented code costs close to nothing.
+    """
+
+    def __init__(self, timings, name, args=None):
+        """
+        Create a timings phase object.
+        """
+        self.__timings = timings
+        self.__name = name
+        self.__args = args
+        self.__startTime = None
+
+    def name(self):
+        """
+        Return the name of the phase.
+        """
+        return self.__name
+
+    def setArg(self, name, value):
+        """
+        Set an argument describing the phase (for instance the value being resolved).
+        """
+        if self.__timings is None:
+            return
+
+        if self.__args is None:
+            self.__args = {}
+        self.__args[name] = value
+
+    def __enter__(self):
+        """
+        Start measuring the phase.
+        """
+        if self.__timings is not None:
+            self.__startTime = time.time()
+
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        """
+        Stop measuring the phase, adding it to the timings.
+        """
+        if self.__timings is None:
+            return
+
+        if excType is not None:
+            self.setArg('error', excType.__name__)
+
+        self.__timings.addEvent(
+            self.__name,
+            self.__startTime,
+            time.time() - self.__startTime,
+            self.__args,
+            threading.current_thread().ident
+        )
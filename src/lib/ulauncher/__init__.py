@@ -1,6 +1,21 @@
+import sys
+from . import Cache
+from .Timings import Timings, InvalidTimingsFormatError
+from .TimingsPhase import TimingsPhase
 from .ResourceResolver import ResourceResolver, ResolveError
+from .ResolverFunctions import ResolverFunctions
+from .PathList import PathList
+from .EnvModifierPlan import EnvModifierPlan
 from .EnvModifier import EnvModifier, InvalidVarError, InvalidVarValueError, InvalidOptionError
+from .LayeredEnvModifier import LayeredEnvModifier
+from . import Capture
+from .ProcessTelemetry import ProcessTelemetry
 from .ProcessExecution import ProcessExecution
+# asyncio support (python 3 only)
+if sys.version_info[0] >= 3:
+    from .AsyncProcessExecution import AsyncProcessExecution
+from . import History
 from . import Launcher
 from . import Loader
 from .LauncherRunner import LauncherRunner, InvalidConfigDirError
+from .BatchRunner import BatchRunner
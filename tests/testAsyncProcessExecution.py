@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import unittest
+
+# asyncio support (python 3 only)
+if sys.version_info[0] >= 3:
+    import asyncio
+    from ulauncher import AsyncProcessExecution
+
+@unittest.skipIf(sys.version_info[0] < 3, 'asyncio requires python 3')
+class AsyncProcessExecutionTest(unittest.TestCase):
+    """
+    Test async process execution.
+    """
+
+    def setUp(self):
+        """
+        Create the event loop and the env used by the processes.
+        """
+        self.loop = asyncio.new_event_loop()
+        self.env = {
+            'PATH': os.environ.get('PATH', '/usr/bin:/bin')
+        }
+
+    def tearDown(self):
+        """
+        Close the event loop.
+        """
+        self.loop.close()
+
+    def testExecute(self):
+        """
+        Test the output and exit status of a process.
+        """
+        lines = []
+        processExecution = self.__execute(
+            AsyncProcessExecution(
+                ['printf "a\\nb"; echo c >&2; exit 3'],
+                self.env,
+                relay=False,
+                stdoutCallback=lines.append,
+                lineCallbacks=True
+            )
+        )
+
+        self.assertEqual(processExecution.exitStatus(), 3)
+        self.assertEqual(processExecution.stdout(), b'a\nb')
+        self.assertEqual(processExecution.stderr(), b'c\n')
+        self.assertEqual(lines, [b'a\n', b'b'])
+
+    def testTimeoutKillsSpawnedProcesses(self):
+        """
+        Test that the timeout is not held by processes spawned by the process.
+        """
+        processExecution = AsyncProcessExecution(['sleep 30 & sleep 30'], self.env, relay=False)
+
+        startTime = time.time()
+        self.__execute(processExecution, timeout=0.5)
+
+        self.assertLess(time.time() - startTime, 5)
+        self.assertTrue(processExecution.timedOut())
+
+    def testSpawnedProcessHoldingStreams(self):
+        """
+        Test that the execution does not wait for processes spawned by the process holding its streams.
+        """
+        processExecution = AsyncProcessExecution(['(sleep 3; echo late) & echo early'], self.env, relay=False)
+
+        startTime = time.time()
+        self.__execute(processExecution)
+
+        self.assertLess(time.time() - startTime, 2)
+        self.assertEqual(processExecution.exitStatus(), 0)
+        self.assertEqual(processExecution.stdout(), b'early\n')
+
+    def testCallbackErrorKillsProcess(self):
+        """
+        Test that the process is killed when a callback raises an error.
+        """
+        def callback(data):
+            raise ValueError('callback error')
+
+        processExecution = AsyncProcessExecution(
+            ['echo a; sleep 30'],
+            self.env,
+            relay=False,
+            stdoutCallback=callback
+        )
+
+        startTime = time.time()
+        self.assertRaises(ValueError, self.__execute, processExecution)
+        self.assertLess(time.time() - startTime, 5)
+        self.assertIsNotNone(processExecution.exitStatus())
+
+    def __execute(self, processExecution, timeout=None):
+        """
+        Execute the process through the event loop.
+        """
+        return self.loop.run_until_complete(
+            asyncio.wait_for(processExecution.execute(timeout), 10)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+import subprocess
+
+class BatchRunnerTest(unittest.TestCase):
+    """
+    Test batch runner.
+    """
+
+    def testImportWithoutConcurrentFutures(self):
+        """
+        Test that the package can be imported when concurrent.futures is not available (python 2).
+        """
+        # asyncio (python 3) depends on concurrent.futures, so it's imported
+        # before concurrent.futures is made unavailable
+        code = '\n'.join([
+            'import sys',
+            'if sys.version_info[0] >= 3:',
+            '    import asyncio',
+            'sys.modules["concurrent.futures"] = None',
+            'import ulauncher',
+            'assert ulauncher.BatchRunner'
+        ])
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+
+        process = subprocess.Popen(
+            [sys.executable, '-c', code],
+            env=env,
+            stderr=subprocess.PIPE
+        )
+        stderr = process.communicate()[1]
+
+        self.assertEqual(process.returncode, 0, stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
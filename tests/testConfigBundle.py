@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from ulauncher.Loader import ConfigBundle
+
+class ConfigBundleTest(unittest.TestCase):
+    """
+    Test config bundle.
+    """
+
+    def setUp(self):
+        """
+        Create a config dir containing a bundle.
+        """
+        self.configDir = tempfile.mkdtemp(prefix='ulauncher')
+        os.makedirs(os.path.join(self.configDir, 'fragments'))
+
+        self.__writeJson('maya.json', {'extends': 'fragments/base.json', 'launcherType': 'bin'})
+        self.__writeJson('fragments/base.json', {'env': {'override': {'A': '1'}}})
+
+        self.bundle = ConfigBundle(ConfigBundle.build(self.configDir))
+
+    def tearDown(self):
+        """
+        Remove the config dir.
+        """
+        self.bundle.close()
+        shutil.rmtree(self.configDir)
+
+    def testBuild(self):
+        """
+        Test that the bundle contains all json files.
+        """
+        self.assertEqual(sorted(self.bundle.names()), ['fragments/base.json', 'maya.json'])
+        self.assertEqual(
+            json.loads(self.bundle.contents('maya.json').decode('utf_8')),
+            {'extends': 'fragments/base.json', 'launcherType': 'bin'}
+        )
+
+    def testFresh(self):
+        """
+        Test that a bundle that has just been built is fresh.
+        """
+        self.assertTrue(self.bundle.isFresh(self.configDir, ['maya.json']))
+        self.assertEqual(self.bundle.outdatedNames(self.configDir), [])
+
+    def testStaleModifiedFile(self):
+        """
+        Test that a configuration modified after the bundle has been built makes it stale.
+        """
+        self.__writeJson('maya.json', {'launcherType': 'bin', 'config': {'args': []}}, mtimeOffset=10)
+
+        self.assertFalse(self.bundle.isFresh(self.configDir, ['maya.json']))
+        self.assertEqual(self.bundle.outdatedNames(self.configDir), ['maya.json'])
+
+    def testStaleConfigDir(self):
+        """
+        Test that a config dir modified after the bundle has been built makes it stale.
+        """
+        self.__writeJson('nuke.json', {'launcherType': 'bin'})
+        futureTime = time.time() + 10
+        os.utime(self.configDir, (futureTime, futureTime))
+
+        self.assertFalse(self.bundle.isFresh(self.configDir))
+        self.assertEqual(self.bundle.outdatedNames(self.configDir), ['nuke.json'])
+
+    def testMissingEntry(self):
+        """
+        Test that a configuration that is not part of the bundle makes it stale.
+        """
+        self.assertFalse(self.bundle.isFresh(self.configDir, ['nuke.json']))
+
+    def __writeJson(self, name, contents, mtimeOffset=0):
+        """
+        Write the json file under the config dir.
+        """
+        filePath = os.path.join(self.configDir, name)
+        with open(filePath, 'w') as f:
+            json.dump(contents, f)
+
+        if mtimeOffset:
+            fileTime = time.time() + mtimeOffset
+            os.utime(filePath, (fileTime, fileTime))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import unittest
+import subprocess
+from ulauncher import ResourceResolver
+from ulauncher.ShellCoprocess import ShellCoprocess
+
+class ResourceResolverTest(unittest.TestCase):
+    """
+    Test resource resolver.
+    """
+
+    def setUp(self):
+        """
+        Create the env used by the resolvers.
+        """
+        self.env = {
+            'PATH': os.environ.get('PATH', '/usr/bin:/bin')
+        }
+
+    def tearDown(self):
+        """
+        Terminate the shells used by the coprocess mode.
+        """
+        ShellCoprocess.closeAll()
+
+    def testNativeExpansionMatchesShell(self):
+        """
+        Test that the values expanded without a shell match the output of the shell.
+        """
+        env = dict(self.env)
+        env['ULAUNCHER_TEST_VAR'] = 'a  b'
+        env['SHLVL'] = '1'
+
+        values = [
+            '$ULAUNCHER_TEST_VAR/c',
+            '${ULAUNCHER_TEST_VAR:-d}',
+            '${ULAUNCHER_UNDEFINED_VAR:-d}',
+            '$ULAUNCHER_UNDEFINED_VAR',
+            '$UID',
+            '$EUID',
+            '$SHLVL',
+            '$HOSTTYPE'
+        ]
+
+        for value in values:
+            shellOutput = subprocess.check_output(
+                ['/bin/sh', '-c', 'echo {0}'.format(value)],
+                env=env
+            ).decode('ascii').rstrip('\n')
+
+            self.assertEqual(
+                ResourceResolver(env, mode='batch').resolve(value),
+                shellOutput,
+                value
+            )
+
+    def testCoprocessVariableIsolation(self):
+        """
+        Test that variables assigned by a value are not visible to the next values (coprocess mode).
+        """
+        resolver = ResourceResolver(self.env, mode='coprocess')
+        self.assertEqual(resolver.resolve('${ULAUNCHER_TEST_VAR:=a}'), 'a')
+        self.assertEqual(resolver.resolve('x$(echo $ULAUNCHER_TEST_VAR)'), 'x')
+
+        # resolvers sharing the same env share the coprocess as well
+        otherResolver = ResourceResolver(self.env, mode='coprocess')
+        self.assertEqual(otherResolver.resolve('x$(echo $ULAUNCHER_TEST_VAR)'), 'x')
+
+    def testCoprocessCurrentDirIsolation(self):
+        """
+        Test that changing the current dir in a value does not affect the next values (coprocess mode).
+        """
+        resolver = ResourceResolver(self.env, mode='coprocess')
+        currentDir = resolver.resolve('$(pwd)')
+        resolver.resolve('$(pwd) ; cd /')
+
+        self.assertEqual(resolver.resolve('$(pwd)'), currentDir)
+
+    def testCoprocessMatchesBatch(self):
+        """
+        Test that the coprocess mode resolves the same values as the batch mode.
+        """
+        values = [
+            '$(echo a)/b',
+            'c:$(printf "%s" "d e")',
+            '${ULAUNCHER_UNDEFINED_VAR:-f}'
+        ]
+
+        self.assertEqual(
+            ResourceResolver(self.env, mode='coprocess').resolveMany(values),
+            ResourceResolver(self.env, mode='batch').resolveMany(values)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()